@@ -1,7 +1,15 @@
 from .editor import init as ed_init
 from .buttons import init as btn_init
 from .browser import init as br_init
+from .background import init as bg_init
+from .prefetch import init as pf_init
+from .suggest import init as sg_init
+from .bundles import init as bd_init
 
 ed_init()
 btn_init()
 br_init()
+bg_init()
+pf_init()
+sg_init()
+bd_init()
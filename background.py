@@ -0,0 +1,220 @@
+from typing import List, Optional, Sequence
+
+from anki import hooks
+from anki.collection import Collection
+from anki.notes import Note, NoteId
+from aqt import mw, gui_hooks
+from aqt.operations import QueryOp
+from aqt.qt import QTimer
+
+from .editor import EXPRESSION_FIELD_NAME, READING_FIELD_NAME, MEANING_FIELD_NAME, fill_data, get_joto_fields
+from .jotoba import request_word
+from .utils import log
+
+config = mw.addonManager.getConfig(__name__)
+
+ENABLED = config.get("Background_Enrichment", False)
+BATCH_SIZE = config.get("Background_Batch_Size", 5)
+INTERVAL = config.get("Background_Interval_Seconds", 30)
+NEW_NOTE_DELAY = 5  # seconds to wait after a note was added before picking it up
+
+IDLE_STATES = ["deckBrowser", "overview"]
+
+_queue: List[NoteId] = []
+_pending: List[Note] = []  # enriched notes waiting for Anki to be idle again before they are saved
+_attempted = set()  # notes already tried this session, so unfillable notes are not picked up again and again
+_running = False
+_should_yield = False
+_timer: Optional[QTimer] = None
+
+
+def is_idle() -> bool:
+    return mw.col is not None and mw.state in IDLE_STATES and not mw.progress.busy() and mw.app.activeModalWidget() is None
+
+
+def find_candidates(col: Collection) -> List[NoteId]:
+    """ Notes of a Jotoba notetype with an expression but no meaning yet """
+    nids = []
+    for notetype in col.models.all_names_and_ids():
+        if not get_joto_fields(col.models.get(notetype.id)):
+            continue
+        search = f'mid:{notetype.id} "{EXPRESSION_FIELD_NAME}:_*" "{MEANING_FIELD_NAME}:" -tag:joto_skip -tag:joto_error'
+        nids += col.find_notes(search)
+    return [nid for nid in nids if nid not in _attempted]
+
+
+def load_notes(col: Collection, nids: Sequence[NoteId]) -> List[Note]:
+    notes = []
+    for nid in nids:
+        try:
+            notes.append(col.get_note(nid))
+        except Exception:  # note was deleted in the meantime
+            pass
+    return notes
+
+
+# Only reads and changes the given note objects, so it runs without holding the collection
+def enrich_notes(notes: Sequence[Note]) -> List[Note]:
+    updated_notes = []
+
+    for note in notes:
+        if _should_yield:
+            log("Background enrichment paused")
+            break
+
+        _attempted.add(note.id)
+
+        expr = note[EXPRESSION_FIELD_NAME]
+        try:
+            word, top_hits = request_word(expr, note[READING_FIELD_NAME])
+        except Exception as e:
+            log("Error: Could not fetch '" + expr + "'")
+            log(e)
+            note.add_tag("joto_error")
+            updated_notes.append(note)
+            continue
+
+        if not word:
+            if top_hits and top_hits[0].expression == expr:
+                word = top_hits[0]
+            else:
+                log("Skipping: no exact hit found")
+                note.add_tag("joto_skip")
+                updated_notes.append(note)
+                continue
+
+        fill_data(note, word, False, overwrite=False)
+        updated_notes.append(note)
+
+    return updated_notes
+
+
+def run_batch():
+    global _running, _should_yield
+
+    if not _queue:
+        _queue.extend(find_candidates(mw.col))
+    if not _queue:
+        return
+
+    batch = _queue[:BATCH_SIZE]
+    del _queue[:BATCH_SIZE]
+
+    _running = True
+    _should_yield = False
+    log(f"Background enrichment of {len(batch)} notes ({len(_queue)} queued)")
+
+    # Operations on the collection run one after another, so only loading and saving the notes use it; the lookups
+    # run beside them and never hold up e.g. answering a card
+    QueryOp(
+        parent=mw,
+        op=lambda col: load_notes(col, batch),
+        success=enrich_batch,
+    ).failure(batch_failed).run_in_background()
+
+
+def enrich_batch(notes: Sequence[Note]):
+    QueryOp(
+        parent=mw,
+        op=lambda col: enrich_notes(notes),
+        success=commit_batch,
+    ).without_collection().failure(batch_failed).run_in_background()
+
+
+def commit_batch(notes: Sequence[Note]):
+    global _running
+    _running = False
+    _pending.extend(notes)  # also commits what was completed before yielding
+    if is_idle():
+        commit_pending()
+
+
+# Saved without an undo step of its own, so Ctrl+Z never silently reverts a background enrichment (Anki clears the
+# undo history on such changes, which only happens while it is idle). A QueryOp does not announce the changes either,
+# so no screen is refreshed; the notes are not shown anywhere while Anki is idle.
+def commit_pending():
+    notes = list(_pending)
+    _pending.clear()
+    if notes:
+        QueryOp(
+            parent=mw,
+            op=lambda col: save_notes(col, notes),
+            success=lambda count: log(f"Background enrichment saved {count} notes"),
+        ).failure(log).run_in_background()
+
+
+def save_notes(col: Collection, notes: Sequence[Note]) -> int:
+    unchanged = []
+    for note in notes:
+        try:
+            if col.get_note(note.id).mod == note.mod:  # skip notes edited since they were enriched
+                unchanged.append(note)
+        except Exception:  # deleted in the meantime
+            pass
+    if unchanged:
+        col.update_notes(unchanged, skip_undo_entry=True)
+    return len(unchanged)
+
+
+def batch_failed(e: Exception):
+    global _running
+    _running = False
+    log(e)
+
+
+def on_timer():
+    if _running or not is_idle():
+        return
+    try:
+        if _pending:
+            commit_pending()
+            return
+        run_batch()
+    except Exception as e:
+        log(e)
+
+
+def on_state_change(new_state: str, old_state: str):
+    global _should_yield
+    if new_state not in IDLE_STATES:
+        _should_yield = True  # e.g. the user started reviewing; stop after the current note
+
+
+def on_note_added(col: Collection, note: Note, deck_id):
+    # Notes from imports, AnkiConnect or other add-ons: check for them soon instead of waiting a full interval.
+    # Other add-ons may add notes from a background thread, and the timer must only be touched on the main thread.
+    if _timer is not None and get_joto_fields(note.note_type()):
+        mw.taskman.run_on_main(reschedule)
+
+
+def reschedule():
+    if _timer is not None:
+        _queue.clear()
+        _timer.start(NEW_NOTE_DELAY * 1000)
+
+
+def on_profile_open():
+    global _timer
+    _timer = QTimer(mw)
+    _timer.timeout.connect(on_timer)
+    _timer.timeout.connect(lambda: _timer.setInterval(INTERVAL * 1000))
+    _timer.start(INTERVAL * 1000)
+
+
+def on_profile_close():
+    global _timer, _should_yield
+    _should_yield = True
+    _queue.clear()
+    _pending.clear()
+    if _timer is not None:
+        _timer.stop()
+        _timer = None
+
+
+def init():
+    if not ENABLED:
+        return
+    gui_hooks.profile_did_open.append(on_profile_open)
+    gui_hooks.profile_will_close.append(on_profile_close)
+    gui_hooks.state_did_change.append(on_state_change)
+    hooks.note_will_be_added.append(on_note_added)
@@ -0,0 +1,135 @@
+# Writes the synthetic Jotoba answers in bench/fixtures that bench/run.py is fed with. They follow the layout of
+# Jotoba's word and sentence API answers and are shaped like the expensive cases (many candidates for a kana query,
+# long sense lists, long furigana), but their content is made up. Deterministic, so timings stay comparable:
+#
+#   python bench/make_fixtures.py
+
+import json
+import os
+import random
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+sys.path.insert(0, os.path.dirname(BENCH_DIR))  # the add-on folder, which holds jotoba_core
+
+from jotoba_core.utils import strip_furigana
+
+# (kanji, kana, glosses, pos) of words read はし or starting with it
+HASHI_WORDS = [
+    ("橋", "はし", ["bridge"], [{"Noun": "Normal"}]),
+    ("箸", "はし", ["chopsticks"], [{"Noun": "Normal"}]),
+    ("端", "はし", ["end", "tip", "edge", "margin"], [{"Noun": "Normal"}]),
+    ("嘴", "はし", ["beak", "bill"], [{"Noun": "Normal"}]),
+    ("梯", "はし", ["ladder"], [{"Noun": "Normal"}]),
+    ("走る", "はしる", ["to run", "to travel (movement of vehicles)"],
+     [{"Verb": {"Godan": "Ru"}}, {"Verb": "Intransitive"}]),
+    ("柱", "はしら", ["pillar", "post"], [{"Noun": "Normal"}, {"Noun": "Suffix"}]),
+    ("梯子", "はしご", ["ladder", "stairs"], [{"Noun": "Normal"}]),
+    ("橋渡し", "はしわたし", ["mediation", "bridge building"],
+     [{"Noun": "Normal"}, {"Verb": {"Irregular": "NounOrAuxSuru"}}]),
+    ("端っこ", "はしっこ", ["end", "edge"], [{"Noun": "Normal"}]),
+    ("はしゃぐ", "はしゃぐ", ["to make merry", "to frolic"],
+     [{"Verb": {"Godan": "Gu"}}, {"Verb": "Intransitive"}]),
+    ("はしたない", "はしたない", ["improper", "shameful"], [{"Adjective": "Keiyoushi"}]),
+    ("端々", "はしばし", ["every part", "bits"], [{"Noun": "Normal"}]),
+    ("橋脚", "はしきょう", ["bridge pier"], [{"Noun": "Normal"}]),
+    ("箸置き", "はしおき", ["chopstick rest"], [{"Noun": "Normal"}]),
+    ("走り書き", "はしりがき", ["scribbling", "hasty writing"],
+     [{"Noun": "Normal"}, {"Verb": {"Irregular": "NounOrAuxSuru"}}]),
+    ("麻疹", "はしか", ["measles"], [{"Noun": "Normal"}]),
+    ("はしけ", "はしけ", ["barge", "lighter"], [{"Noun": "Normal"}]),
+    ("橋桁", "はしげた", ["bridge girder"], [{"Noun": "Normal"}]),
+]
+
+TORU_SENSES = [
+    "to take", "to pick up", "to harvest", "to earn", "to win", "to choose", "to steal", "to eat", "to have (a meal)",
+    "to remove", "to get rid of", "to undertake", "to engage in", "to assume (responsibility)", "to adopt (a method)",
+    "to maintain (e.g. balance)", "to interpret", "to grasp", "to make (a copy)", "to write down", "to subscribe to",
+    "to reserve", "to book", "to save", "to set aside", "to secure", "to keep", "to take up (time, space)",
+    "to occupy", "to spare", "to charge", "to collect", "to exact", "to take (a wife)", "to take on (an apprentice)",
+    "to accept", "to receive", "to take (a vacation)", "to pay (attention)", "to keep (count)",
+]
+
+SENTENCE_PARTS = [
+    "[私|わたし]は", "[毎日|まい|にち]", "[日本語|に|ほん|ご]を", "[勉強|べん|きょう]しています",
+    "[図書館|と|しょ|かん]で", "[新聞|しん|ぶん]を[読|よ]みます", "[友達|とも|だち]と", "[駅|えき]まで[歩|ある]いて",
+    "[先生|せん|せい]に", "[質問|しつ|もん]をしました", "[昨日|きのう]は", "[雨|あめ]が[降|ふ]っていたので",
+    "[家|いえ]で[料理|りょう|り]を[作|つく]りました",
+]
+
+
+def pitch(kana: str, drop: int) -> list:
+    parts = [{"part": kana[:1], "high": drop == 1}]
+    if drop != 1:
+        parts.append({"part": kana[1:drop] if drop else kana[1:], "high": True})
+    rest = kana[drop:] if drop else ""
+    if rest:
+        parts.append({"part": rest, "high": False})
+    return parts
+
+
+def word_record(kanji: str, kana: str, senses: list, rng: random.Random, common: bool) -> dict:
+    reading = {"kana": kana}
+    if kanji != kana:
+        reading["kanji"] = kanji
+    record = {"reading": reading, "common": common, "senses": senses}
+    if rng.random() < 0.5:
+        record["audio"] = f"/audio/{kana}.ogg"
+    if rng.random() < 0.7:
+        record["pitch"] = pitch(kana, rng.randrange(0, len(kana)))
+    return record
+
+
+def many_hits(rng: random.Random) -> dict:
+    words = []
+    for i, (kanji, kana, glosses, pos) in enumerate(HASHI_WORDS):
+        senses = [{"glosses": glosses, "pos": pos, "language": "English"}]
+        if kana == kanji:
+            senses[0]["misc"] = "UsuallyWrittenInKana"
+        words.append(word_record(kanji, kana, senses, rng, i < 5))
+    return {"kanji": [], "words": words}
+
+
+def long_senses(rng: random.Random) -> dict:
+    senses = []
+    for i in range(0, len(TORU_SENSES), 2):
+        sense = {"glosses": TORU_SENSES[i:i + 2], "pos": [{"Verb": {"Godan": "Ru"}}, {"Verb": "Transitive"}],
+                 "language": "English"}
+        if i % 8 == 6:
+            sense["misc"] = "Colloquialism"
+        senses.append(sense)
+    toru = word_record("取る", "とる", senses, rng, True)
+    toru["audio"] = "/audio/とる.ogg"
+    toru["pitch"] = pitch("とる", 1)
+    toru2 = word_record("撮る", "とる", [{"glosses": ["to take (a photo)", "to film"],
+                                      "pos": [{"Verb": {"Godan": "Ru"}}, {"Verb": "Transitive"}]}], rng, True)
+    return {"kanji": [], "words": [toru, toru2]}
+
+
+def long_sentences(rng: random.Random) -> dict:
+    sentences = []
+    for i in range(12):
+        furigana = "".join(rng.choice(SENTENCE_PARTS) for _ in range(12)) + "。"
+        sentences.append({"content": strip_furigana(furigana), "furigana": furigana,
+                          "translation": f"Synthetic sentence {i + 1}.", "language": "English"})
+    return {"sentences": sentences}
+
+
+def write(name: str, data: dict):
+    with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+
+
+def main():
+    rng = random.Random(7)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    write("words_kana_many_hits.json", many_hits(rng))
+    write("words_long_senses.json", long_senses(rng))
+    write("sentences_long_furigana.json", long_sentences(rng))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Microbenchmarks for the parsing and rendering functions of jotoba_core, fed with synthetic Jotoba answers in the
+# layout of the real ones (see make_fixtures.py). jotoba_core does not import aqt, so the Anki side is not needed here.
+#
+#   python bench/run.py                       timings of all benchmarks
+#   python bench/run.py pitch furigana        only benchmarks whose name contains one of the words
+#   python bench/run.py --json results.json   also write the timings, e.g. to compare runs over time
+#   python bench/run.py --profile             also write a cProfile and a tracemalloc report per benchmark
+
+import argparse
+import contextlib
+import cProfile
+import json
+import os
+import pstats
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from typing import Callable, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+ARTIFACT_DIR = os.path.join(BENCH_DIR, "artifacts")
+
+sys.path.insert(0, os.path.dirname(BENCH_DIR))  # the add-on folder, which holds jotoba_core
+
+from jotoba_core.utils import format_furigana
+from jotoba_core.words import Word, find_word, get_pitch_html, get_pos, parse_pos
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def benchmarks() -> List[Tuple[str, Callable[[], object]]]:
+    many_hits = load_fixture("words_kana_many_hits.json")
+    long_senses = load_fixture("words_long_senses.json")
+    sentences = load_fixture("sentences_long_furigana.json")["sentences"]
+    long_word = long_senses["words"][0]
+    all_words = many_hits["words"] + long_senses["words"]
+    all_pos = [(w, p) for w in all_words for s in w["senses"] for p in s["pos"]]
+
+    return [
+        ("find_word kana, many hits", lambda: find_word(many_hits, "はし", "", "https://jotoba.de")),
+        ("find_word kana with reading", lambda: find_word(many_hits, "はし", "はしか", "https://jotoba.de")),
+        ("find_word long senses", lambda: find_word(long_senses, "取る", "とる", "https://jotoba.de")),
+        ("Word long senses", lambda: Word(long_word, "https://jotoba.de")),
+        ("get_pos long senses", lambda: get_pos(long_word)),
+        ("parse_pos all tags", lambda: [parse_pos(w, p) for w, p in all_pos]),
+        ("get_pitch_html all words", lambda: [get_pitch_html(w) for w in all_words]),
+        ("format_furigana long sentences", lambda: [format_furigana(s["furigana"]) for s in sentences]),
+    ]
+
+
+def artifact_name(name: str) -> str:
+    return name.replace(" ", "_").replace(",", "")
+
+
+# Like pytest-benchmark: calibrate the loop count to about 0.1s per round, report per call timings over the rounds
+def measure(fn: Callable[[], object], rounds: int) -> dict:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(repeat=rounds, number=number)]
+    return {"min": min(times), "mean": statistics.mean(times), "stdev": statistics.stdev(times) if rounds > 1 else 0.0,
+            "rounds": rounds, "loops": number}
+
+
+def profile(name: str, fn: Callable[[], object], loops: int, directory: str):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(loops):
+        fn()
+    profiler.disable()
+    base = os.path.join(directory, artifact_name(name))
+    profiler.dump_stats(base + ".prof")  # open with snakeviz or pstats
+    with open(base + ".cprofile.txt", "w") as f:
+        pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(25)
+
+    tracemalloc.start(25)
+    before = tracemalloc.take_snapshot()
+    result = fn()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    with open(base + ".tracemalloc.txt", "w") as f:
+        f.write(f"{name}: peak {peak} bytes for one call\n\n")
+        for stat in after.compare_to(before, "lineno")[:25]:
+            f.write(f"{stat}\n")
+
+
+def format_time(seconds: float) -> str:
+    for unit, factor in [("s", 1), ("ms", 1e3), ("us", 1e6)]:
+        if seconds * factor >= 1:
+            return f"{seconds * factor:.2f} {unit}"
+    return f"{seconds * 1e9:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parsing and rendering functions of jotoba_core")
+    parser.add_argument("filter", nargs="*", help="only run benchmarks whose name contains one of these words")
+    parser.add_argument("--rounds", type=int, default=5, help="timing rounds per benchmark")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--profile", action="store_true", help="write cProfile and tracemalloc reports per benchmark")
+    parser.add_argument("--artifacts", default=ARTIFACT_DIR, help="folder for the profiles (default: bench/artifacts)")
+    args = parser.parse_args()
+
+    selected = [(name, fn) for name, fn in benchmarks() if not args.filter or any(f in name for f in args.filter)]
+    if args.profile:
+        os.makedirs(args.artifacts, exist_ok=True)
+
+    results = {}
+    for name, fn in selected:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):  # find_word logs every ambiguity
+            result = measure(fn, args.rounds)
+            if args.profile:
+                profile(name, fn, result["loops"], args.artifacts)
+        results[name] = result
+        print(f"{name:<36} min {format_time(result['min']):>10}   mean {format_time(result['mean']):>10}"
+              f"   ± {format_time(result['stdev']):>10}   ({result['loops']} loops x {result['rounds']})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"created": time.time(), "python": sys.version, "benchmarks": results}, f, indent=2)
+    if args.profile:
+        print(f"Profiles written to {args.artifacts}")
+
+
+if __name__ == "__main__":
+    main()
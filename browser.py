@@ -1,14 +1,17 @@
-import time
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from anki.notes import NoteId, Note
 from anki.collection import Collection
 from aqt.browser import Browser
-from typing import List, Sequence, Tuple
+from typing import List, Sequence
 
 import aqt.progress
 
-from .editor import EXPRESSION_FIELD_NAME, READING_FIELD_NAME, PITCH_FIELD_NAME, MEANING_FIELD_NAME, POS_FIELD_NAME, EXAMPLE_FIELD_PREFIX, get_joto_fields
+from .editor import EXPRESSION_FIELD_NAME, READING_FIELD_NAME, PITCH_FIELD_NAME, MEANING_FIELD_NAME, POS_FIELD_NAME, EXAMPLE_FIELD_PREFIX, KANJI_FIELD_NAME, get_joto_fields
 from .jotoba import *
-from .utils import format_furigana, log
+from .progress import ThrottledProgress
+from .review import Ambiguous, review_ambiguous
+from .utils import log
 import aqt
 from aqt import progress
 from aqt import mw, gui_hooks
@@ -16,6 +19,11 @@ from aqt.operations import CollectionOp, OpChanges, QueryOp
 from aqt.utils import showInfo
 from aqt.qt import *
 
+BULK_WORKERS = mw.addonManager.getConfig(__name__).get("Bulk_Concurrent_Lookups", 2)
+FINGERPRINT_DIR = os.path.join(USER_FILES_DIR, "fingerprints")  # one database per profile
+
+_fingerprint_store: Optional[FingerprintStore] = None
+
 
 def setup_browser_menu(browser: Browser):
     """ Add bulk-add menu """
@@ -24,20 +32,6 @@ def setup_browser_menu(browser: Browser):
     browser.form.menuEdit.addSeparator()
     browser.form.menuEdit.addAction(a)
 
-def sanitize(word: str) -> str:
-    if word.find("（") != -1:
-        word = word[:word.find("（")] # Remove parenthesis and everything after
-    if word.find("」") != -1:
-        word = word[word.find("」") + 1:]
-    if word.find("] ") != -1:
-        word = word[word.find("] ") + 2:]
-    if word.find("］") != -1:
-        word = word[word.find("］") + 1:]
-    word = word.replace("～", "")
-    
-    return word
-
-
 def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
     dialog = QDialog(browser.window())
     dialog.setWindowTitle("Select options")
@@ -52,6 +46,7 @@ def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
     meaning_checkbox = QCheckBox("Meaning")
     pos_checkbox = QCheckBox("POS")
     sentences_checkbox = QCheckBox("Sentences")
+    kanji_checkbox = QCheckBox("Kanji")
 
     expression_checkbox.setChecked(False)
     reading_checkbox.setChecked(True)
@@ -59,6 +54,7 @@ def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
     meaning_checkbox.setChecked(True)
     pos_checkbox.setChecked(True)
     sentences_checkbox.setChecked(True)
+    kanji_checkbox.setChecked(True)
 
     label_2 = QLabel("If an exact match is not found")
     behaviour_radio = QButtonGroup()
@@ -66,7 +62,6 @@ def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
     replace_similar_radio = QRadioButton("Replace with similar")
     skip_unk_radio = QRadioButton("Skip")
     skip_unk_radio.setChecked(True)
-    select_result_radio.setDisabled(True)
     behaviour_radio.addButton(replace_similar_radio)
     behaviour_radio.addButton(skip_unk_radio)
     behaviour_radio.addButton(select_result_radio)
@@ -79,6 +74,13 @@ def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
     overwrite_radio.addButton(overwrite_do_radio)
     overwrite_radio.addButton(overwrite_skip_radio)
 
+    only_changed_checkbox = QCheckBox("Only update notes whose Jotoba data changed since the last bulk update")
+    only_changed_checkbox.setToolTip("Asks Jotoba again for every note instead of using cached or bundled answers. "
+                                     "Needs \"Overwrite field\", as changed data would otherwise only reach empty fields")
+    only_changed_checkbox.setChecked(False)
+    only_changed_checkbox.setEnabled(False)
+    overwrite_do_radio.toggled.connect(only_changed_checkbox.setEnabled)
+
     dialog.layout().addWidget(label_1, 0, 0, 1, 3)
     dialog.layout().addWidget(expression_checkbox, 1, 0)
     dialog.layout().addWidget(reading_checkbox, 1, 1)
@@ -86,13 +88,15 @@ def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
     dialog.layout().addWidget(meaning_checkbox, 2, 0)
     dialog.layout().addWidget(pos_checkbox, 2, 1)
     dialog.layout().addWidget(sentences_checkbox, 2, 2)
-    dialog.layout().addWidget(label_2, 3, 0, 1, 3)
-    dialog.layout().addWidget(select_result_radio, 4, 0)
-    dialog.layout().addWidget(replace_similar_radio, 4, 1)
-    dialog.layout().addWidget(skip_unk_radio, 4, 2)
-    dialog.layout().addWidget(label_3, 5, 0, 1, 3)
-    dialog.layout().addWidget(overwrite_do_radio, 6, 0)
-    dialog.layout().addWidget(overwrite_skip_radio, 6, 1)
+    dialog.layout().addWidget(kanji_checkbox, 3, 0)
+    dialog.layout().addWidget(label_2, 4, 0, 1, 3)
+    dialog.layout().addWidget(select_result_radio, 5, 0)
+    dialog.layout().addWidget(replace_similar_radio, 5, 1)
+    dialog.layout().addWidget(skip_unk_radio, 5, 2)
+    dialog.layout().addWidget(label_3, 6, 0, 1, 3)
+    dialog.layout().addWidget(overwrite_do_radio, 7, 0)
+    dialog.layout().addWidget(overwrite_skip_radio, 7, 1)
+    dialog.layout().addWidget(only_changed_checkbox, 8, 0, 1, 3)
 
     ok_button = QPushButton("OK")
     ok_button.clicked.connect(dialog.accept)
@@ -100,8 +104,8 @@ def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
     cancel_button = QPushButton("Cancel")
     cancel_button.clicked.connect(dialog.reject)
 
-    dialog.layout().addWidget(ok_button, 7, 0)
-    dialog.layout().addWidget(cancel_button, 7, 1)
+    dialog.layout().addWidget(ok_button, 9, 0)
+    dialog.layout().addWidget(cancel_button, 9, 1)
 
     dialog.exec()
 
@@ -113,14 +117,53 @@ def bulk_options_dialog(browser: Browser) -> dict[str, bool]:
             "meaning": meaning_checkbox.isChecked(),
             "pos": pos_checkbox.isChecked(),
             "sentences": sentences_checkbox.isChecked(),
+            "kanji": kanji_checkbox.isChecked(),
             "replace_similar": replace_similar_radio.isChecked(),
             "skip_unk": skip_unk_radio.isChecked(),
-            "overwrite": overwrite_do_radio.isChecked()
+            "select_result": select_result_radio.isChecked(),
+            "overwrite": overwrite_do_radio.isChecked(),
+            "only_changed": only_changed_checkbox.isChecked() and overwrite_do_radio.isChecked()
         }
     else:
         return None
     
-def fetch_and_update_notes(browser: Browser, col: Collection, nids: Sequence[NoteId], options: dict[str, bool]) -> List[Note]:
+class BulkResult:
+    notes: List[Note]
+    fingerprints: dict[NoteId, str]  # stored once the notes are committed
+    ambiguous: List[Ambiguous]  # reviewed by the user before committing
+    processed: int
+    total: int
+    cancelled: bool
+
+    def __init__(self, notes: List[Note], fingerprints: dict[NoteId, str], ambiguous: List[Ambiguous], processed: int,
+                 total: int, cancelled: bool):
+        self.notes = notes
+        self.fingerprints = fingerprints
+        self.ambiguous = ambiguous
+        self.processed = processed
+        self.total = total
+        self.cancelled = cancelled
+
+
+def get_fingerprint_store() -> FingerprintStore:
+    global _fingerprint_store
+    if _fingerprint_store is None:
+        os.makedirs(FINGERPRINT_DIR, exist_ok=True)
+        _fingerprint_store = FingerprintStore(os.path.join(FINGERPRINT_DIR, mw.pm.name + ".db"))
+    return _fingerprint_store
+
+
+# Identifies the Jotoba data a note is filled from, together with the fields it is used for
+def note_fingerprint(word: Word, sentences: Optional[List[dict]], options: dict[str, bool]) -> str:
+    fields = [key for key in ["expression", "reading", "pitch", "meaning", "pos", "sentences", "kanji"] if options[key]]
+    return fingerprint([word.fingerprint, sentences, fields])
+
+
+# Looks up one note and fills its fields; only touches the note object, so it can run on a worker thread.
+# Returns the note (None if it does not need to be saved) and the fingerprint of the data it was filled from.
+# Notes left for manual selection are added to ambiguous instead.
+def update_note(note: Note, options: dict[str, bool], old_fingerprint: Optional[str],
+                ambiguous: List[Ambiguous]) -> tuple[Optional[Note], Optional[str]]:
     expression = options["expression"]
     reading = options["reading"]
     pitch = options["pitch"]
@@ -128,166 +171,261 @@ def fetch_and_update_notes(browser: Browser, col: Collection, nids: Sequence[Not
     pos = options["pos"]
     sentences = options["sentences"]
     replace_similar = options["replace_similar"]
-    skip_unk = options["skip_unk"]
     overwrite = options["overwrite"]
-    
-    updated_notes = []
 
-    replaced_with = []
-    
-    for i, nid in enumerate(nids):
+    if not overwrite:
+        need_change = expression and note[EXPRESSION_FIELD_NAME] == "" or reading and note[READING_FIELD_NAME] == "" or pitch and note[PITCH_FIELD_NAME] == "" or meaning and note[MEANING_FIELD_NAME] == "" or pos and note[POS_FIELD_NAME] == ""
 
-        log(f"Processing note {i + 1} of {len(nids)}")
-        aqt.mw.taskman.run_on_main(
-            lambda: aqt.mw.progress.update(
-                label=f"Processing notes... ({i}/{len(nids)})",
-                value=i,
-                max=len(nids),
-            )
-        )
+        if sentences:
+            for i in range(3):
+                if note[EXAMPLE_FIELD_PREFIX + str(i + 1)] == "":
+                    need_change = True
+                    break
+
+        if options["kanji"] and KANJI_FIELD_NAME in note and note[KANJI_FIELD_NAME] == "":
+            need_change = True
+
+        if not need_change:
+            log("Skipping: nothing to complete and overwrite option disabled")
+            return None, None
+
+    try:
+        kana = note[READING_FIELD_NAME]
+        # comparing against cached or bundled data would never notice a change on Jotoba's side
+        word, top_hits = request_word(sanitize(note[EXPRESSION_FIELD_NAME]), kana, fresh=options["only_changed"])
+    except Exception as e:
+        log("Error: Could not fetch '" + note[EXPRESSION_FIELD_NAME] + "'")
+        log(e)
+        note.add_tag("joto_error")
+        return note, None
+
+    if not word:
+        if top_hits == []:
+            note.add_tag("joto_skip")
+            log("Skipping: no hits found")
+            return note, None
+        elif top_hits[0].expression == note[EXPRESSION_FIELD_NAME]:
+            word = top_hits[0]
+        elif replace_similar:
+            word = top_hits[0]
+        elif options["select_result"]:
+            log("No exact hit found, keeping candidates for manual selection")
+            ambiguous.append(Ambiguous(note, top_hits, fetch_sentences(note[EXPRESSION_FIELD_NAME], options), old_fingerprint))
+            return None, None
+        else:
+            note.add_tag("joto_skip")
+            log("Skipping: no exact hit found")
+            return note, None
+
+    set_expression = expression and (note[EXPRESSION_FIELD_NAME] == "" or overwrite)
+
+    # Everything is fetched before the first field is written, so unchanged notes can be left alone
+    found_sentences = fetch_sentences(word.expression if set_expression else note[EXPRESSION_FIELD_NAME], options)
+    if options["kanji"] and KANJI_FIELD_NAME in note:
+        resolve_kanji([word.expression])  # usually resolved for the whole selection already
+
+    return apply_word(note, word, found_sentences, options, old_fingerprint)
+
+
+def fetch_sentences(expr: str, options: dict[str, bool]) -> Optional[List[dict]]:
+    if not options["sentences"]:
+        return None
+    try:
+        return request_sentence(expr, fresh=options["only_changed"])
+    except:
+        log("Did not find any sentences")
+        return None
 
-        time.sleep(.1) # dont ask
 
-        note = col.get_note(nid)
+# Writes the fetched data into the note's fields; returns the note (None if nothing changed) and its fingerprint.
+# Without overwrite, filled fields may still hold other data, so there is no fingerprint to remember for the note.
+def apply_word(note: Note, word: Word, found_sentences: Optional[List[dict]], options: dict[str, bool],
+               old_fingerprint: Optional[str]) -> tuple[Optional[Note], Optional[str]]:
+    expression = options["expression"]
+    reading = options["reading"]
+    pitch = options["pitch"]
+    meaning = options["meaning"]
+    pos = options["pos"]
+    sentences = options["sentences"]
+    kanji = options["kanji"] and KANJI_FIELD_NAME in note
+    overwrite = options["overwrite"]
+
+    new_fingerprint = note_fingerprint(word, found_sentences, options)
+    if options["only_changed"] and new_fingerprint == old_fingerprint:
+        log("Skipping: Jotoba data unchanged")
+        return None, new_fingerprint
+
+    before = (list(note.fields), list(note.tags))
+
+    if expression and (note[EXPRESSION_FIELD_NAME] == "" or overwrite):
+        note[EXPRESSION_FIELD_NAME] = word.expression
+
+    if reading and (note[READING_FIELD_NAME] == "" or overwrite):
+        note[READING_FIELD_NAME] = word.reading
+
+    if pitch and (note[PITCH_FIELD_NAME] == "" or overwrite) and word.pitch != "":
+        note[PITCH_FIELD_NAME] = word.pitch
+
+    if meaning and (note[MEANING_FIELD_NAME] == "" or overwrite):
+        note[MEANING_FIELD_NAME] = meaning_text(word)
+
+    if pos and (note[POS_FIELD_NAME] == "" or overwrite):
+        note[POS_FIELD_NAME] = pos_text(word)
+
+    if sentences:
+        if found_sentences is None:
+            note.add_tag("joto_no_sentences")
+        else:
+            fill_sentences(note, found_sentences, overwrite)
 
+    if kanji and (note[KANJI_FIELD_NAME] == "" or overwrite):
+        note[KANJI_FIELD_NAME] = kanji_field_html(word.expression)  # from the kanji store, no request
+
+    if not overwrite:
+        new_fingerprint = None
+
+    if (list(note.fields), list(note.tags)) == before:
+        return None, new_fingerprint  # nothing to sync
+
+    return note, new_fingerprint
+
+
+# Returns False if the user cancelled
+def resolve_selection_kanji(texts: List[str]) -> bool:
+    kanji_progress = ThrottledProgress("Looking up kanji...", 0, "kanji")
+
+    def on_progress(done: int, total: int):
+        kanji_progress.total = total
+        kanji_progress.update(done)
+
+    lookups = resolve_kanji(texts, BULK_WORKERS, on_progress, kanji_progress.want_cancel)
+    log(f"Looked up {lookups} kanji")
+    return not kanji_progress.want_cancel()
+
+
+def fetch_and_update_notes(browser: Browser, col: Collection, nids: Sequence[NoteId], options: dict[str, bool]) -> BulkResult:
+    updated_notes = []
+    fingerprints = {}
+    processed = 0
+    cancelled = False
+    progress = ThrottledProgress("Processing notes...", len(nids))
+
+    def collect(futures):
+        nonlocal processed
+        for future in futures:
+            processed += 1
+            note = future_notes[future]
+            try:
+                updated, note_fp = future.result()
+            except Exception as e:  # anything update_note did not expect must not cost the notes already done
+                log("Error: Could not update '" + note[EXPRESSION_FIELD_NAME] + "'")
+                log(e)
+                note.add_tag("joto_error")
+                updated, note_fp = note, None
+            if updated is not None:
+                updated_notes.append(updated)
+            if note_fp is not None:
+                fingerprints[note.id] = note_fp
+        progress.update(processed)
+
+    # Notes are loaded on this thread (the collection must not be used concurrently), lookups run on the pool
+    notes = []
+    for nid in nids:
+        note = col.get_note(nid)
         if not get_joto_fields(note.note_type()):
             log("Skipping: wrong note type")
+            processed += 1
             continue
+        notes.append(note)
 
-        if not options["overwrite"]:
-            need_change = expression and note[EXPRESSION_FIELD_NAME] == "" or reading and note[READING_FIELD_NAME] == "" or pitch and note[PITCH_FIELD_NAME] == "" or meaning and note[MEANING_FIELD_NAME] == "" or pos and note[POS_FIELD_NAME] == ""
-
-            if sentences:
-                for i in range(3):
-                    if note[EXAMPLE_FIELD_PREFIX + str(i + 1)] == "":
-                        need_change = True
-                        break
-
-            if not need_change:
-                log("Skipping: nothing to complete and overwrite option disabled")
-                continue
-
-        try:
-            kana = note[READING_FIELD_NAME]
-            word, top_hits = request_word(sanitize(note[EXPRESSION_FIELD_NAME]), kana) # somehow interfering with aqt progress
-        except Exception as e:
-            log("Error: Could not fetch '" + note[EXPRESSION_FIELD_NAME] + "'")
-            log(e)
-            note.add_tag("joto_error")
-            updated_notes.append(note)
-            continue
+    if options["kanji"]:
+        # Kanji repeat a lot across a deck: look up each distinct one once for the whole selection
+        cancelled = not resolve_selection_kanji([n[EXPRESSION_FIELD_NAME] for n in notes if KANJI_FIELD_NAME in n])
 
-        if not word:
-            if top_hits == []:
-                note.add_tag("joto_skip")
-                updated_notes.append(note)
-                log("Skipping: no hits found")
-                continue
-            elif top_hits[0].expression == note[EXPRESSION_FIELD_NAME]:
-                word = top_hits[0]
-            elif replace_similar:
-                word = top_hits[0]
-                replaced_with.append([note[EXPRESSION_FIELD_NAME], word.expression])
-            elif skip_unk:
-                note.add_tag("joto_skip")
-                updated_notes.append(note)
-                log("Skipping: no exact hit found")
-                continue
-            else: # todo: implement manual selection
-                note.add_tag("joto_skip")
-                updated_notes.append(note)
-                log("Skipping: no exact hit found")
-                continue
-                #TODO: mw.progress...? is causing the dialog to be unreachable (processing.. window shows up and blocks the dialog)
-                dialog = QDialog(browser.window())
-                dialog.setWindowTitle("Select word")
-                dialog.setWindowModality(Qt.WindowModality.WindowModal)
-                dialog.setLayout(QVBoxLayout())
-
-                word = top_hits[0]
-
-                def set_word(value):
-                    global word
-                    word = value
-
-                for i, word in enumerate(top_hits):
-                    button = QPushButton(word.expression)
-                    button.clicked.connect(lambda i=i: set_word(top_hits[i]))
-                    dialog.layout().addWidget(button)
-
-                dialog.exec() # Wait for dialog to close
-
-                if word is None:
-                    note.add_tag("joto_skip")
-                    updated_notes.append(note)
-                    continue
-
-        if expression and (note[EXPRESSION_FIELD_NAME] == "" or overwrite):
-            note[EXPRESSION_FIELD_NAME] = word.expression
-        
-        if reading and (note[READING_FIELD_NAME] == "" or overwrite):
-            note[READING_FIELD_NAME] = word.reading
-            
-        if pitch and (note[PITCH_FIELD_NAME] == "" or overwrite) and word.pitch != "":
-            note[PITCH_FIELD_NAME] = word.pitch
-            
-        if meaning and (note[MEANING_FIELD_NAME] == "" or overwrite):
-            note[MEANING_FIELD_NAME] = "; ".join(word.glosses[:3])
-            
-        if pos and (note[POS_FIELD_NAME] == "" or overwrite):
-            note[POS_FIELD_NAME] = "; ".join(word.part_of_speech)
+    store = get_fingerprint_store()
+    future_notes = {}
+    ambiguous = []
+    with ThreadPoolExecutor(max_workers=BULK_WORKERS) as pool:
+        in_flight = set()
+        for note in notes:
+            if cancelled or progress.want_cancel():
+                log("Bulk update cancelled, waiting for running lookups")
+                cancelled = True
+                break
+
+            while len(in_flight) >= BULK_WORKERS:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            future = pool.submit(update_note, note, options, store.get(note.id), ambiguous)
+            future_notes[future] = note
+            in_flight.add(future)
+
+        collect(wait(in_flight).done)  # lookups that already started are finished and kept
+
+    if options["kanji"] and ambiguous:
+        # the review dialog fills the kanji field from the store, so every candidate has to be known beforehand
+        resolve_selection_kanji([hit.expression for item in ambiguous if KANJI_FIELD_NAME in item.note for hit in item.top_hits])
+
+    progress.update(processed, force=True)
+    return BulkResult(updated_notes, fingerprints, ambiguous, processed, len(nids), cancelled)
 
-        if sentences:
-            try:
-                sentences = request_sentence(note[EXPRESSION_FIELD_NAME])
-                
-                if overwrite:
-                    for i, sentence in enumerate(sentences):
-                        if i > 2:
-                            break
-                        field_name = EXAMPLE_FIELD_PREFIX + str(i + 1)
-                        note[field_name] = format_furigana(sentence["furigana"])
-                else:
-                    need_sentence = []
-                    for i in range(3):
-                        if note[EXAMPLE_FIELD_PREFIX + str(i + 1)] == "":
-                            need_sentence.append(i)
-                    
-                    for i,j in zip(need_sentence, range(len(sentences))):
-                        field_name = EXAMPLE_FIELD_PREFIX + str(i + 1)
-                        note[field_name] = format_furigana(sentences[j]["furigana"])
-            except:
-                log("Did not find any sentences")
-                note.add_tag("joto_no_sentences")
-                pass
-        
-        updated_notes.append(note)
-    
-    return updated_notes
-                   
 def bulk_update_selected_notes(browser: Browser):
     options = bulk_options_dialog(browser)
 
     if options is None:
         return
-    
+
+    nids = browser.selected_notes()
+
     fetch_op = QueryOp(
         parent=browser.window(),
-        op=lambda col: fetch_and_update_notes(browser, col, browser.selected_notes(), options),
-        success=lambda notes: commit_changes(browser, browser.col, notes)
+        op=lambda col: fetch_and_update_notes(browser, col, nids, options),
+        success=lambda result: commit_changes(browser, browser.col, result, options)
     )
 
     fetch_op.with_progress("Updating notes...").run_in_background()
 
-def commit_changes(browser: Browser, col: Collection, notes: Sequence[Note]):
-    if not notes:
+# Applies the words picked for ambiguous notes from the candidates fetched during the run
+def review_ambiguous_notes(browser: Browser, result: BulkResult, options: dict[str, bool]):
+    choices = review_ambiguous(browser.window(), result.ambiguous)
+
+    for item, word in zip(result.ambiguous, choices):
+        if word is None:
+            item.note.add_tag("joto_skip")
+            result.notes.append(item.note)
+            continue
+
+        word_options = options
+        set_expression = options["expression"] and (item.note[EXPRESSION_FIELD_NAME] == "" or options["overwrite"])
+        if set_expression and word.expression != item.note[EXPRESSION_FIELD_NAME]:
+            # the sentences were fetched for the typed expression, not for the one written now
+            log("Skipping sentences: fetched for a different expression")
+            word_options = dict(options, sentences=False)
+
+        note, note_fp = apply_word(item.note, word, item.sentences, word_options, item.old_fingerprint)
+        if note is not None:
+            result.notes.append(note)
+        if note_fp is not None:
+            result.fingerprints[item.note.id] = note_fp
+
+def commit_changes(browser: Browser, col: Collection, result: BulkResult, options: dict[str, bool]):
+    if result.ambiguous:
+        review_ambiguous_notes(browser, result, options)
+
+    if not result.notes:
+        get_fingerprint_store().put_many(result.fingerprints)
         showInfo("No notes to update")
         return
-    commit_op(notes, browser.window()).success(lambda op_changes: commit_success(op_changes)).run_in_background()
+    commit_op(result.notes, browser.window()).success(lambda op_changes: commit_success(op_changes, result)).run_in_background()
 
-def commit_success(op_changes: OpChanges):
+def commit_success(op_changes: OpChanges, result: BulkResult):
     log(f"{op_changes}")
-    showInfo(f"Updated notes")
+    get_fingerprint_store().put_many(result.fingerprints)
+    if result.cancelled:
+        showInfo(f"Cancelled after {result.processed} of {result.total} notes. Updated {len(result.notes)} notes")
+    else:
+        showInfo(f"Updated {len(result.notes)} notes")
 
 def commit_op(notes: Sequence[Note], parent: QWidget) -> CollectionOp[OpChanges]:
     return CollectionOp(
@@ -0,0 +1,91 @@
+import os
+import time
+from typing import List
+
+from aqt import mw, gui_hooks
+from aqt.qt import *
+from aqt.utils import askUser, showInfo
+
+from .jotoba import *
+
+
+class BundlesDialog(QDialog):
+    """ Lists the imported bundles; bundles can be imported and removed here """
+    paths: List[str]
+
+    def __init__(self, parent: QWidget):
+        super().__init__(parent)
+        self.paths = []
+
+        self.setWindowTitle("Jotoba bundles")
+        self.setMinimumWidth(450)
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        layout.addWidget(QLabel(f"Lookups are answered from these bundles first. Bundles older than "
+                                f"{CONFIG.cache_max_age_days:g} days (Cache_Max_Age_Days) are not used."))
+        self.list_widget = QListWidget()
+        layout.addWidget(self.list_widget)
+
+        import_btn = QPushButton("Import...")
+        import_btn.clicked.connect(self.import_bundle)
+        remove_btn = QPushButton("Remove")
+        remove_btn.clicked.connect(self.remove_bundle)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(import_btn)
+        btn_layout.addWidget(remove_btn)
+        btn_layout.addStretch()
+        btn_layout.addWidget(close_btn)
+        layout.addLayout(btn_layout)
+
+        self.show_bundles()
+
+    # The files are not kept open, so they can be replaced or removed
+    def show_bundles(self):
+        self.paths = []
+        self.list_widget.clear()
+        for bundle in imported_bundles():
+            bundle.close()
+            self.paths.append(bundle.path)
+            created = time.strftime("%Y-%m-%d", time.localtime(bundle.created))
+            text = f"{os.path.basename(bundle.path)} ({bundle.language}, {created})"
+            if bundle.expired(CONFIG.cache_max_age_days):
+                text += " - expired"
+            self.list_widget.addItem(text)
+
+    def import_bundle(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import Jotoba bundle", "", f"Jotoba bundle (*{BUNDLE_SUFFIX})")
+        if not path:
+            return
+        try:
+            import_bundle(path)
+        except BundleError as e:
+            showInfo(str(e), parent=self)
+        self.show_bundles()
+
+    def remove_bundle(self):
+        row = self.list_widget.currentRow()
+        if row < 0:
+            return
+        path = self.paths[row]
+        if not askUser(f"Remove {os.path.basename(path)}?", parent=self):
+            return
+        remove_bundle(path)
+        self.show_bundles()
+
+
+def open_bundles_dialog():
+    BundlesDialog(mw).exec()
+
+
+def setup_tools_menu():
+    a = QAction("Jotoba bundles...", mw)
+    a.triggered.connect(open_bundles_dialog)
+    mw.form.menuTools.addAction(a)
+
+
+def init():
+    gui_hooks.main_window_did_init.append(setup_tools_menu)
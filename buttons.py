@@ -29,9 +29,14 @@ def get_audio(editor: Editor):
         return
 
     try:
-        set_audio_in_editor(word.audio_url, editor)
+        audio_url = word.audio_url
     except AttributeError:
         showInfo("Word has no audio")
+        return
+
+    if is_audio_cached(audio_url):  # prefetched, no need to download it again
+        audio_url = request_audio(audio_url)
+    set_audio_in_editor(audio_url, editor)
 
 
 def set_audio_in_editor(audio: str, editor: Editor):
@@ -4,23 +4,10 @@ from aqt import mw, gui_hooks
 from aqt.utils import showInfo
 
 from .jotoba import *
-from .utils import format_furigana, log
-
-# Field constants
-EXPRESSION_FIELD_NAME = "Expression"
-READING_FIELD_NAME = "Reading"
-PITCH_FIELD_NAME = "Pitch"
-MEANING_FIELD_NAME = "Meaning"
-POS_FIELD_NAME = "POS"
-IMAGE_FIELD_NAME = "Image"
-AUDIO_FIELD_NAME = "Audio"
-NOTES_FIELD_NAME = "Notes"
-EXAMPLE_FIELD_PREFIX = "Example "
-
-ALL_FIELDS = [EXPRESSION_FIELD_NAME, READING_FIELD_NAME, PITCH_FIELD_NAME, MEANING_FIELD_NAME, POS_FIELD_NAME,
-             IMAGE_FIELD_NAME, AUDIO_FIELD_NAME, NOTES_FIELD_NAME, EXAMPLE_FIELD_PREFIX + "1",
-             EXAMPLE_FIELD_PREFIX + "1 Audio", EXAMPLE_FIELD_PREFIX + "2", EXAMPLE_FIELD_PREFIX + "2 Audio",
-             EXAMPLE_FIELD_PREFIX + "3", EXAMPLE_FIELD_PREFIX + "3 Audio"]
+from .jotoba_core.fields import (EXPRESSION_FIELD_NAME, READING_FIELD_NAME, PITCH_FIELD_NAME, MEANING_FIELD_NAME,
+                                 POS_FIELD_NAME, IMAGE_FIELD_NAME, AUDIO_FIELD_NAME, NOTES_FIELD_NAME,
+                                 EXAMPLE_FIELD_PREFIX, KANJI_FIELD_NAME, ALL_FIELDS, fill_sentences, fill_word)
+from .utils import log
 
 
 def fill_data(note: Note, word: Word, flag: bool, overwrite: bool = True):
@@ -28,34 +15,21 @@ def fill_data(note: Note, word: Word, flag: bool, overwrite: bool = True):
     if word is None:  # word not found or ambiguity (no kana reading) -> user will call again after providing reading
         return flag
 
-    if overwrite or note[EXPRESSION_FIELD_NAME] == "":
-        note[EXPRESSION_FIELD_NAME] = word.expression
-
-    if overwrite or note[READING_FIELD_NAME] == "":
-        note[READING_FIELD_NAME] = word.reading
-
-    if overwrite or note[PITCH_FIELD_NAME] == "":
-        note[PITCH_FIELD_NAME] = word.pitch
-
-    if overwrite or note[MEANING_FIELD_NAME] == "":
-        note[MEANING_FIELD_NAME] = "; ".join(word.glosses[:3])
-
-    if overwrite or note[POS_FIELD_NAME] == "":
-        note[POS_FIELD_NAME] = "; ".join(word.part_of_speech)
+    fill_word(note, word, overwrite)
 
     try:
-        sentences = request_sentence(word.expression)
-        for i, sentence in enumerate(sentences):
-            if i > 2:
-                break
-
-            field_name = EXAMPLE_FIELD_PREFIX + str(i + 1)
-            if overwrite or note[field_name] == "":
-                note[field_name] = format_furigana(sentence["furigana"])
+        fill_sentences(note, request_sentence(word.expression), overwrite)
     except Exception as e:
         log(e)
         pass
 
+    if KANJI_FIELD_NAME in note and (overwrite or note[KANJI_FIELD_NAME] == ""):
+        try:
+            resolve_kanji([word.expression])
+            note[KANJI_FIELD_NAME] = kanji_field_html(word.expression)
+        except Exception as e:
+            log(e)
+
     return True
 
 
@@ -119,5 +93,19 @@ def fill_on_focus_lost(flag: bool, note: Note, fidx: int):
 
     return fill_data(note, word, flag)
 
+# Reads no collection data, so it does not hold up the collection's operations (e.g. rendering the deck list)
+def load_corpus_in_background():
+    def done(future):
+        try:
+            future.result()
+        except Exception as e:
+            log("Error: Could not load the sentence corpus")
+            log(e)
+
+    if CONFIG.sentence_corpus_path:
+        mw.taskman.run_in_background(load_sentence_corpus, done, uses_collection=False)
+
+
 def init():
     gui_hooks.editor_did_unfocus_field.append(fill_on_focus_lost)
+    gui_hooks.profile_did_open.append(load_corpus_in_background)
@@ -0,0 +1,17 @@
+# Lookup and transformation core of the add-on. Must not import aqt/anki so it can be used headless (see cli.py).
+from .api import (build_suggestions, close_bundles, export_bundle, get_bundles, get_cache, get_corpus,
+                  get_kanji_store, get_router, is_audio_cached, is_cached, loaded_corpus, lookup, reload_bundles, request,
+                  request_audio, request_kanji, request_sentence, request_word, resolve_kanji,
+                  stored_answer, suggest)
+from .bundle import BUNDLE_SUFFIX, Bundle, BundleError, BundleWriter, load_bundles
+from .cache import LookupCache, normalize_query
+from .config import Config
+from .corpus import SentenceCorpus, load_corpus
+from .fields import fill_sentences, fill_word, meaning_text, pos_text
+from .fingerprints import FingerprintStore
+from .kanji import Kanji, KanjiStore, get_kanji, is_kanji, kanji_html, kanji_in
+from .router import Instance, Router
+from .trie import PrefixIndex, load_dictionary
+from .utils import fingerprint, format_furigana, log, strip_furigana
+from .words import (Word, find_word, gloss_count, get_glosses, get_katakana, get_pitch, get_pitch_html, get_pos,
+                    parse_misc, parse_pos, sanitize)
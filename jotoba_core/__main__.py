@@ -0,0 +1,12 @@
+import os
+import sys
+
+if __package__ in (None, ""):
+    # Started as `python path/to/jotoba_core`: import the package on its own, without the Anki add-on around it
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from jotoba_core.cli import main
+else:
+    from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
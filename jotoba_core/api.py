@@ -0,0 +1,323 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import json
+import os
+import pathlib
+import threading
+import requests
+
+from .bundle import Bundle, BundleWriter, load_bundles
+from .cache import LookupCache
+from .config import Config
+from .corpus import SentenceCorpus, load_corpus
+from .kanji import KanjiStore, kanji_in
+from .router import Router
+from .trie import PrefixIndex, load_dictionary
+from .utils import log
+from .words import Word, find_word
+
+_corpora: Dict[str, Optional[SentenceCorpus]] = {}
+_corpus_lock = threading.Lock()
+_caches: Dict[str, LookupCache] = {}
+_routers: Dict[tuple, Router] = {}
+_kanji_stores: Dict[str, KanjiStore] = {}
+_bundles: Dict[str, List[Bundle]] = {}
+_suggestions: Dict[tuple, PrefixIndex] = {}  # ready to use
+_suggestions_building: Dict[tuple, PrefixIndex] = {}
+_suggestions_rebuild = set()
+_suggestions_lock = threading.Lock()
+
+
+# Reads or builds the index of a sentence dump, which takes a while for big dumps; call it from a background thread
+def get_corpus(path: str) -> Optional[SentenceCorpus]:
+    with _corpus_lock:
+        if path not in _corpora:
+            _corpora[path] = load_corpus(path)
+        return _corpora[path]
+
+
+# The corpus if it has been loaded already, without waiting for it
+def loaded_corpus(path: str) -> Optional[SentenceCorpus]:
+    return _corpora.get(path)
+
+
+def get_cache(config: Config) -> Optional[LookupCache]:
+    if not config.cache_dir:
+        return None
+    if config.cache_dir not in _caches:
+        _caches[config.cache_dir] = LookupCache(config.cache_dir, config.cache_max_age_days)
+    return _caches[config.cache_dir]
+
+
+def get_router(config: Config) -> Router:
+    key = tuple(config.jotoba_urls)
+    if key not in _routers:
+        _routers[key] = Router(config.jotoba_urls)
+    return _routers[key]
+
+
+def get_kanji_store(config: Config) -> KanjiStore:
+    if config.kanji_db_path not in _kanji_stores:
+        _kanji_stores[config.kanji_db_path] = KanjiStore(config.kanji_db_path)
+    return _kanji_stores[config.kanji_db_path]
+
+
+# The imported bundles that are not older than config.cache_max_age_days
+def get_bundles(config: Config) -> List[Bundle]:
+    if config.bundle_dir not in _bundles:
+        _bundles[config.bundle_dir] = load_bundles(config.bundle_dir)
+    return [b for b in _bundles[config.bundle_dir] if not b.expired(config.cache_max_age_days)]
+
+
+# Call before replacing or removing bundle files in config.bundle_dir
+def close_bundles(config: Config):
+    for bundle in _bundles.pop(config.bundle_dir, []):
+        bundle.close()
+
+
+# Call after adding or removing bundle files in config.bundle_dir
+def reload_bundles(config: Config) -> List[Bundle]:
+    close_bundles(config)
+    bundles = get_bundles(config)
+    key = suggestion_key(config)
+    if key in _suggestions or key in _suggestions_building:  # suggestions are in use; the old index serves meanwhile
+        threading.Thread(target=build_suggestions, args=(config,), daemon=True).start()
+    return bundles
+
+
+# Answer from the imported bundles or the cache, without any request
+def stored_answer(kind: str, text, config: Config) -> Optional[tuple[str, str]]:
+    for bundle in get_bundles(config):
+        hit = bundle.get(kind, config.language, text)
+        if hit is not None:
+            return hit
+    cache = get_cache(config)
+    if cache is not None:
+        return cache.get(kind, config.language, text)
+    return None
+
+
+def is_cached(kind: str, text, config: Config) -> bool:
+    return stored_answer(kind, text, config) is not None
+
+
+# Returns (base_url, body) of the response, answered from bundles or the cache if possible.
+# fresh always asks Jotoba (and refreshes the cache), for checking whether its data changed.
+def lookup(kind: str, text, config: Config, fresh: bool = False) -> tuple[str, str]:
+    if not fresh:
+        hit = stored_answer(kind, text, config)
+        if hit is not None:
+            return hit
+    cache = get_cache(config)
+
+    suffix = config.words_suffix if kind == "words" else config.sentence_suffix
+    base_url, res = get_router(config).send(lambda url: request(url + suffix, text, config.language, config.request_timeout))
+    res.raise_for_status()
+
+    if cache is not None:
+        cache.put(kind, config.language, text, base_url, res.text)  # audio urls have to point to the instance that answered
+    return base_url, res.text
+
+
+def request_sentence(text, config: Config, fresh: bool = False) -> List[dict]:
+    corpus = loaded_corpus(config.sentence_corpus_path)  # Jotoba answers until get_corpus has loaded it
+    if corpus is not None:
+        sentences = corpus.search(text, config.sentence_count)
+        if sentences:
+            return sentences
+    return json.loads(lookup("sentences", text, config, fresh)[1])["sentences"]
+
+
+def request_word(text, config: Config, kana="", fresh: bool = False) -> tuple[Optional[Word], List[Word]]:
+    log("Looking up '" + text + "' ...")
+    base_url, body = lookup("words", text, config, fresh)
+    add_suggestions(body, base_url, config)
+    return find_word(json.loads(body), text, kana, base_url)
+
+
+def suggestion_key(config: Config) -> tuple:
+    return config.language, config.bundle_dir, config.cache_dir, config.dictionary_path
+
+
+# Prefix index over every word answer that is stored locally and the dictionary dump. Takes a while, so call it from
+# a background thread; suggest keeps using the previous index until the new one is done. Words looked up while it is
+# being built are added to both.
+def build_suggestions(config: Config):
+    key = suggestion_key(config)
+    with _suggestions_lock:
+        if key in _suggestions_building:
+            _suggestions_rebuild.add(key)  # e.g. another bundle was imported meanwhile; build again afterwards
+            return
+        index = PrefixIndex()
+        _suggestions_building[key] = index
+
+    while True:
+        try:
+            sources = [bundle.entries("words", config.language) for bundle in get_bundles(config)]
+            cache = get_cache(config)
+            if cache is not None:
+                sources.append(cache.entries("words", config.language))
+            for entries in sources:
+                for base_url, body in entries:
+                    index.add_response(body, base_url)
+            load_dictionary(index, config.dictionary_path, config.jotoba_url)
+        except Exception as e:
+            with _suggestions_lock:
+                if key not in _suggestions_rebuild:
+                    del _suggestions_building[key]
+                    raise
+                _suggestions_rebuild.discard(key)  # the bundles changed meanwhile; the rebuild reads them again
+                index = PrefixIndex()
+                _suggestions_building[key] = index
+            log(e)
+            continue
+
+        with _suggestions_lock:
+            _suggestions[key] = index
+            if key not in _suggestions_rebuild:
+                del _suggestions_building[key]
+                return
+            _suggestions_rebuild.discard(key)
+            index = PrefixIndex()
+            _suggestions_building[key] = index
+
+
+def add_suggestions(body: str, base_url: str, config: Config):
+    key = suggestion_key(config)
+    with _suggestions_lock:
+        indexes = [_suggestions.get(key), _suggestions_building.get(key)]
+    for index in dict.fromkeys(i for i in indexes if i is not None):
+        index.add_response(body, base_url)
+
+
+# Never waits for the index; nothing is suggested before build_suggestions has finished once
+def suggest(text: str, config: Config, limit: int = 8) -> List[Word]:
+    index = _suggestions.get(suggestion_key(config))
+    if index is None:
+        return []
+    return index.search(text, limit)
+
+
+def request_kanji(literal: str, config: Config) -> dict:
+    suffix = config.kanji_suffix
+    _, res = get_router(config).send(lambda url: request(url + suffix, literal, config.language, config.request_timeout))
+    res.raise_for_status()
+    for kanji in json.loads(res.text)["kanji"]:
+        if kanji["literal"] == literal:
+            return kanji
+    return {"literal": literal}  # unknown to Jotoba; stored anyway so it is not asked for again
+
+
+# Looks up every kanji of the given texts that is not in the store yet, each one once; returns the number of lookups
+# should_stop is checked between two kanji; the lookups that already started are finished
+def resolve_kanji(texts: List[str], config: Config, workers: int = 1,
+                  on_progress: Optional[Callable[[int, int], None]] = None,
+                  should_stop: Optional[Callable[[], bool]] = None) -> int:
+    store = get_kanji_store(config)
+    # every kanji is looked up by one thread only; the others wait for it
+    missing, others = store.claim(config.language, [c for text in texts for c in kanji_in(text)])
+
+    def fetch(literal: str) -> Optional[dict]:
+        for bundle in get_bundles(config):
+            record = bundle.kanji(config.language, literal)
+            if record is not None:
+                return record
+        try:
+            return request_kanji(literal, config)
+        except Exception as e:  # left out of the store, so it is tried again next time
+            log("Error: Could not fetch kanji '" + literal + "'")
+            log(e)
+            return None
+
+    done = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch, literal) for literal in missing]
+            for literal, future in zip(missing, futures):
+                if should_stop is not None and should_stop():
+                    for f in futures:
+                        f.cancel()
+                    break
+                record = future.result()
+                if record is not None:
+                    store.put(config.language, record)
+                store.release(config.language, literal)
+                done += 1
+                if on_progress is not None:
+                    on_progress(done, len(missing))
+    finally:
+        for literal in missing:
+            store.release(config.language, literal)
+    for event in others:
+        event.wait()
+    return done
+
+
+def audio_name(url: str) -> str:
+    return url.rstrip("/").split("/")[-1]
+
+
+def bundled_audio(url: str, config: Config) -> Optional[bytes]:
+    for bundle in get_bundles(config):
+        data = bundle.audio(audio_name(url))
+        if data is not None:
+            return data
+    return None
+
+
+def is_audio_cached(url: str, config: Config) -> bool:
+    cache = get_cache(config)
+    if cache is None:
+        return False
+    return os.path.exists(cache.audio_path(url)) or bundled_audio(url, config) is not None
+
+
+# Downloads audio into the cache and returns a file:// url to it, or the remote url if there is no cache
+def request_audio(url: str, config: Config) -> str:
+    cache = get_cache(config)
+    if cache is None:
+        return url
+
+    path = cache.audio_path(url)
+    if not os.path.exists(path):
+        data = bundled_audio(url, config)
+        if data is None:
+            res = requests.get(url, timeout=config.request_timeout)
+            res.raise_for_status()
+            data = res.content
+        with open(path + ".part", "wb") as f:
+            f.write(data)
+        os.replace(path + ".part", path)
+    return pathlib.Path(path).as_uri()
+
+
+# Writes what is known locally about the given queries into a bundle file; returns the number of entries
+def export_bundle(path: str, config: Config, words: List[str], sentences: List[str], kanji_texts: List[str],
+                  audio_urls: List[str]) -> int:
+    store = get_kanji_store(config)
+    cache = get_cache(config)
+    with BundleWriter(path, config.language) as writer:
+        for kind, queries in [("words", words), ("sentences", sentences)]:
+            for query in queries:
+                hit = stored_answer(kind, query, config)
+                if hit is not None:
+                    writer.add(kind, query, hit[0], hit[1])
+
+        for literal in dict.fromkeys(c for text in kanji_texts for c in kanji_in(text)):
+            record = store.record(config.language, literal)
+            if record is not None:
+                writer.add_kanji(record)
+
+        if cache is not None:
+            for url in audio_urls:
+                if is_audio_cached(url, config):
+                    request_audio(url, config)  # copies bundled audio into the cache
+                    writer.add_audio(audio_name(url), cache.audio_path(url))
+    return writer.count
+
+
+def request(URL, text, language, timeout: Optional[float] = None) -> requests.Response:
+    data = json.dumps({"query": text, "language": language, "no_english": True}, ensure_ascii=False)
+    headers = {"Content-Type": "application/json; charset=utf-8", "Accept": "application/json"}
+    return requests.post(URL, data=data.encode('utf-8'), headers=headers, timeout=timeout)
@@ -0,0 +1,144 @@
+import json
+import os
+import time
+import zipfile
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from .cache import normalize_query
+from .utils import log
+
+BUNDLE_FORMAT = "jotoba-bundle"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".jbundle"
+MANIFEST = "manifest.json"
+
+# A bundle is a zip file: every answer is its own compressed member named after its kind and normalized query,
+# so the zip's central directory serves as the index and single answers can be read without unpacking the rest.
+
+
+def entry_name(kind: str, query: str) -> str:
+    return f"{kind}/{quote(normalize_query(query), safe='')}"
+
+
+class BundleError(Exception):
+    pass
+
+
+class BundleWriter:
+    """ Writes precomputed Jotoba answers (words, sentences, kanji, audio) into a bundle file """
+    language: str
+    count: int
+
+    def __init__(self, path: str, language: str):
+        self.language = language
+        self.count = 0
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self._names = set()
+
+    def _write(self, name: str, data, compress_type: int = zipfile.ZIP_DEFLATED):
+        if name in self._names:
+            return
+        self._names.add(name)
+        self._zip.writestr(name, data, compress_type=compress_type)
+        self.count += 1
+
+    def add(self, kind: str, query: str, base_url: str, body: str):
+        self._write(entry_name(kind, query), json.dumps({"base_url": base_url, "body": body}, ensure_ascii=False))
+
+    def add_kanji(self, record: dict):
+        self._write(entry_name("kanji", record["literal"]), json.dumps(record, ensure_ascii=False))
+
+    def add_audio(self, name: str, path: str):
+        with open(path, "rb") as f:
+            self._write("audio/" + name, f.read(), zipfile.ZIP_STORED)  # audio is compressed already
+
+    def close(self):
+        manifest = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "language": self.language,
+                    "created": time.time(), "entries": self.count}
+        self._zip.writestr(MANIFEST, json.dumps(manifest))
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Bundle:
+    """ Read access to a bundle file """
+    path: str
+    language: str
+    created: float
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self._zip = zipfile.ZipFile(path)
+            manifest = json.loads(self._zip.read(MANIFEST))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            raise BundleError(f"{path} is not a Jotoba bundle") from e
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise BundleError(f"{path} is not a Jotoba bundle")
+        if manifest.get("version", 0) > BUNDLE_VERSION:
+            raise BundleError(f"{path} was made by a newer version of the add-on")
+        self.language = manifest["language"]
+        self.created = manifest["created"]
+
+    # Bundles are answers from one point in time; like cached answers, they are not used once they are too old
+    def expired(self, max_age_days: float) -> bool:
+        return time.time() - self.created > max_age_days * 24 * 60 * 60
+
+    def close(self):
+        self._zip.close()
+
+    def _read(self, name: str) -> Optional[bytes]:
+        try:
+            return self._zip.read(name)
+        except (KeyError, ValueError):  # ValueError: closed as the file is being replaced or removed
+            return None
+
+    def get(self, kind: str, language: str, query: str) -> Optional[Tuple[str, str]]:
+        """ Returns (base_url, body) like LookupCache.get """
+        if language != self.language:
+            return None
+        data = self._read(entry_name(kind, query))
+        if data is None:
+            return None
+        entry = json.loads(data)
+        return entry["base_url"], entry["body"]
+
+    def entries(self, kind: str, language: str) -> Iterator[Tuple[str, str]]:
+        """ (base_url, body) of every answer of a kind """
+        if language != self.language:
+            return
+        for name in self._zip.namelist():
+            if name.startswith(kind + "/"):
+                data = self._read(name)
+                if data is None:  # closed as the file is being replaced or removed
+                    return
+                entry = json.loads(data)
+                yield entry["base_url"], entry["body"]
+
+    def kanji(self, language: str, literal: str) -> Optional[dict]:
+        if language != self.language:
+            return None
+        data = self._read(entry_name("kanji", literal))
+        return json.loads(data) if data is not None else None
+
+    def audio(self, name: str) -> Optional[bytes]:
+        return self._read("audio/" + name)
+
+
+def load_bundles(directory: str) -> List[Bundle]:
+    bundles = []
+    if not directory or not os.path.isdir(directory):
+        return bundles
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(BUNDLE_SUFFIX):
+            try:
+                bundles.append(Bundle(os.path.join(directory, name)))
+            except BundleError as e:
+                log(e)
+    return bundles
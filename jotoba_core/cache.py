@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Iterator, Optional, Tuple
+
+DB_NAME = "cache.db"
+AUDIO_DIR = "audio"
+
+
+def normalize_query(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).strip()
+
+
+class LookupCache:
+    """ Raw Jotoba responses by kind ("words", "sentences") and normalized query, plus downloaded audio files """
+    directory: str
+    max_age: float
+
+    def __init__(self, directory: str, max_age_days: float = 30):
+        self.directory = directory
+        self.max_age = max_age_days * 24 * 60 * 60
+        os.makedirs(os.path.join(directory, AUDIO_DIR), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, DB_NAME), timeout=30, check_same_thread=False)
+        self._db.execute("""
+            create table if not exists responses (
+                kind text not null,
+                language text not null,
+                query text not null,
+                base_url text not null,
+                body text not null,
+                fetched real not null,
+                primary key (kind, language, query)
+            )""")
+        self._db.commit()
+
+    def get(self, kind: str, language: str, query: str) -> Optional[Tuple[str, str]]:
+        """ Returns (base_url, body) of a fresh entry """
+        with self._lock:
+            row = self._db.execute(
+                "select base_url, body, fetched from responses where kind = ? and language = ? and query = ?",
+                (kind, language, normalize_query(query))).fetchone()
+        if row is None or time.time() - row[2] > self.max_age:
+            return None
+        return row[0], row[1]
+
+    def put(self, kind: str, language: str, query: str, base_url: str, body: str):
+        with self._lock:
+            self._db.execute("insert or replace into responses values (?, ?, ?, ?, ?, ?)",
+                             (kind, language, normalize_query(query), base_url, body, time.time()))
+            self._db.commit()
+
+    def entries(self, kind: str, language: str) -> Iterator[Tuple[str, str]]:
+        """ (base_url, body) of every fresh entry of a kind """
+        with self._lock:
+            rows = self._db.execute("select base_url, body from responses where kind = ? and language = ? and fetched > ?",
+                                    (kind, language, time.time() - self.max_age)).fetchall()
+        return iter(rows)
+
+    def audio_path(self, url: str) -> str:
+        return os.path.join(self.directory, AUDIO_DIR, url.rstrip("/").split("/")[-1])
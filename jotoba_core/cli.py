@@ -0,0 +1,157 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+
+from .api import get_corpus, request_sentence, request_word
+from .config import Config, DEFAULT_JOTOBA_URL
+from .fields import ALL_FIELDS, AUDIO_FIELD_NAME, EXPRESSION_FIELD_NAME, READING_FIELD_NAME, fill_sentences, fill_word
+from .utils import log
+from .words import sanitize
+
+TAGS_COLUMN = "Tags"
+PROGRESS_INTERVAL = 10  # seconds between two progress lines
+
+_config: Optional[Config] = None
+_media_dir: Optional[str] = None
+
+
+def init_worker(config: Config, media_dir: Optional[str]):
+    global _config, _media_dir
+    _config = config
+    _media_dir = media_dir
+    get_corpus(config.sentence_corpus_path)
+
+
+def download_audio(url: str) -> str:
+    filename = "jotoba_" + url.rstrip("/").split("/")[-1]
+    path = os.path.join(_media_dir, filename)
+    if not os.path.exists(path):
+        res = requests.get(url, timeout=_config.request_timeout)
+        res.raise_for_status()
+        with open(path, "wb") as f:
+            f.write(res.content)
+    return f"[sound:{filename}]"
+
+
+def enrich(row: Tuple[str, str]) -> Tuple[dict, List[str]]:
+    expr, kana = row
+    note = {f: "" for f in ALL_FIELDS}
+    note[EXPRESSION_FIELD_NAME] = expr
+    note[READING_FIELD_NAME] = kana
+
+    try:
+        word, top_hits = request_word(sanitize(expr), _config, kana)
+    except Exception as e:
+        log("Error: Could not fetch '" + expr + "'")
+        log(e)
+        return note, ["joto_error"]
+
+    if not word:
+        if top_hits and top_hits[0].expression == expr:
+            word = top_hits[0]
+        else:
+            log("Skipping: no exact hit found for '" + expr + "'")
+            return note, ["joto_skip"]
+
+    fill_word(note, word, overwrite=False)
+    tags = []
+
+    try:
+        fill_sentences(note, request_sentence(word.expression, _config))
+    except Exception:
+        tags.append("joto_no_sentences")
+
+    if _media_dir is not None and hasattr(word, "audio_url"):
+        try:
+            note[AUDIO_FIELD_NAME] = download_audio(word.audio_url)
+        except Exception as e:
+            log(e)
+
+    return note, tags
+
+
+def read_rows(path: str, delimiter: str, reading_column: Optional[int], skip_header: bool) -> List[Tuple[str, str]]:
+    rows = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for i, columns in enumerate(csv.reader(f, delimiter=delimiter)):
+            if (skip_header and i == 0) or not columns or columns[0].startswith("#"):
+                continue
+            kana = ""
+            if reading_column is not None and reading_column < len(columns):
+                kana = columns[reading_column].strip()
+            rows.append((columns[0].strip(), kana))
+    return rows
+
+
+def clean(text: str) -> str:
+    return text.replace("\t", " ").replace("\r", "").replace("\n", "<br>")
+
+
+# Writes a file in Anki's text import format, with the columns named after the note fields. Every note is flushed as
+# soon as it is written, so an interrupted run keeps what was done; returns (written, not found or failed)
+def write_notes(path: str, results: Iterable[Tuple[dict, List[str]]], total: int) -> Tuple[int, int]:
+    columns = ALL_FIELDS + [TAGS_COLUMN]
+    written = failed = 0
+    start = last_log = time.time()
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("#separator:tab\n")
+        f.write("#html:true\n")
+        f.write("#columns:" + "\t".join(columns) + "\n")
+        f.write(f"#tags column:{len(columns)}\n")
+        for note, tags in results:
+            f.write("\t".join([clean(note[field]) for field in ALL_FIELDS] + [" ".join(tags)]) + "\n")
+            f.flush()
+            written += 1
+            if "joto_error" in tags or "joto_skip" in tags:
+                failed += 1
+
+            now = time.time()
+            if now - last_log >= PROGRESS_INTERVAL:
+                last_log = now
+                rate = written / (now - start)
+                log(f"{written}/{total} notes ({rate:.1f}/s, {failed} not found or failed)")
+    return written, failed
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="jotoba_core", description="Enrich a CSV/TSV list of expressions with data from Jotoba and write a file Anki can import.")
+    parser.add_argument("input", help="CSV or TSV file, one expression per row in the first column")
+    parser.add_argument("output", help="Tab separated output file for Anki's importer")
+    parser.add_argument("--reading-column", type=int, default=None, help="Zero based column holding a kana reading to disambiguate the expression")
+    parser.add_argument("--header", action="store_true", help="Skip the first row of the input")
+    parser.add_argument("--delimiter", default=None, help="Input delimiter (default: ',' for .csv files, tab otherwise)")
+    parser.add_argument("--workers", type=int, default=4, help="Number of worker processes (default: 4)")
+    parser.add_argument("--language", default="English", help="Language of the translations (default: English)")
+    parser.add_argument("--url", action="append", default=None, help=f"Jotoba instance to query, repeat to spread the load over several (default: {DEFAULT_JOTOBA_URL})")
+    parser.add_argument("--sentence-corpus", default="", help="Local sentence dump to take example sentences from")
+    parser.add_argument("--cache-dir", default="", help="Keep Jotoba responses in this directory and reuse them on later runs")
+    parser.add_argument("--media-dir", default=None, help="Download audio into this directory (copy its contents into collection.media)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    delimiter = args.delimiter
+    if delimiter is None:
+        delimiter = "," if args.input.lower().endswith(".csv") else "\t"
+
+    config = Config(language=args.language, jotoba_url=args.url or DEFAULT_JOTOBA_URL, sentence_corpus_path=args.sentence_corpus,
+                    cache_dir=args.cache_dir)
+    if args.media_dir is not None:
+        os.makedirs(args.media_dir, exist_ok=True)
+
+    get_corpus(config.sentence_corpus_path)  # built once here, the workers read the index file
+    rows = read_rows(args.input, delimiter, args.reading_column, args.header)
+    log(f"Enriching {len(rows)} expressions with {args.workers} workers")
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker, initargs=(config, args.media_dir)) as pool:
+        written, failed = write_notes(args.output, pool.map(enrich, rows, chunksize=16), len(rows))
+
+    log(f"Wrote {written} notes to {args.output} ({failed} not found or failed)")
+    return 0
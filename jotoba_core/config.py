@@ -0,0 +1,65 @@
+from typing import List, Union
+
+DEFAULT_JOTOBA_URL = "https://jotoba.de"
+DEFAULT_WORDS_SUFFIX = "/api/search/words"
+DEFAULT_SENTENCE_SUFFIX = "/api/search/sentences"
+DEFAULT_KANJI_SUFFIX = "/api/search/kanji"
+
+
+class Config:
+    """ Settings for talking to Jotoba, independent of Anki's add-on config """
+    language: str
+    jotoba_urls: List[str]
+    words_suffix: str
+    sentence_suffix: str
+    kanji_suffix: str
+    sentence_corpus_path: str
+    sentence_count: int
+    cache_dir: str
+    cache_max_age_days: float
+    request_timeout: float
+    kanji_db_path: str
+    bundle_dir: str
+    dictionary_path: str
+
+    def __init__(self, language: str = "English", jotoba_url: Union[str, List[str]] = DEFAULT_JOTOBA_URL,
+                 words_suffix: str = DEFAULT_WORDS_SUFFIX, sentence_suffix: str = DEFAULT_SENTENCE_SUFFIX,
+                 sentence_corpus_path: str = "", sentence_count: int = 3, cache_dir: str = "",
+                 cache_max_age_days: float = 30, request_timeout: float = 10,
+                 kanji_suffix: str = DEFAULT_KANJI_SUFFIX, kanji_db_path: str = "", bundle_dir: str = "",
+                 dictionary_path: str = ""):
+        self.language = language
+        self.jotoba_urls = [jotoba_url] if isinstance(jotoba_url, str) else list(jotoba_url)  # requests are routed across all
+        self.words_suffix = words_suffix
+        self.sentence_suffix = sentence_suffix
+        self.kanji_suffix = kanji_suffix
+        self.sentence_corpus_path = sentence_corpus_path
+        self.sentence_count = sentence_count
+        self.cache_dir = cache_dir  # empty: no caching
+        self.cache_max_age_days = cache_max_age_days
+        self.request_timeout = request_timeout
+        self.kanji_db_path = kanji_db_path  # empty: kanji are only kept in memory
+        self.bundle_dir = bundle_dir  # imported bundles, consulted before the cache and Jotoba
+        self.dictionary_path = dictionary_path  # optional word dump for suggestions
+
+    @property
+    def jotoba_url(self) -> str:
+        return self.jotoba_urls[0]
+
+    # Build from the add-on's config.json layout; paths are passed separately as they depend on where the add-on lives
+    @classmethod
+    def from_dict(cls, config: dict, cache_dir: str = "", kanji_db_path: str = "", bundle_dir: str = "") -> "Config":
+        return cls(
+            language=config.get("Language", "English"),
+            jotoba_url=config.get("Jotoba_URL", DEFAULT_JOTOBA_URL),
+            words_suffix=config.get("API_Words_Suffix", DEFAULT_WORDS_SUFFIX),
+            sentence_suffix=config.get("API_Sentence_Suffix", DEFAULT_SENTENCE_SUFFIX),
+            sentence_corpus_path=config.get("Sentence_Corpus_Path", ""),
+            cache_dir=cache_dir if config.get("Cache_Lookups", True) else "",
+            cache_max_age_days=config.get("Cache_Max_Age_Days", 30),
+            request_timeout=config.get("Request_Timeout_Seconds", 10),
+            kanji_suffix=config.get("API_Kanji_Suffix", DEFAULT_KANJI_SUFFIX),
+            kanji_db_path=kanji_db_path,
+            bundle_dir=bundle_dir,
+            dictionary_path=config.get("Dictionary_Path", ""),
+        )
@@ -0,0 +1,144 @@
+from bisect import bisect_left
+import marshal
+import math
+import os
+from typing import Dict, List, Optional
+
+from .utils import log, strip_furigana
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".idx"
+COMMONNESS_WEIGHT = 2.0  # how much a sentence made of frequent bigrams is preferred over a merely short one
+
+
+def ngrams(text: str) -> List[str]:
+    if len(text) < 2:
+        return [text] if text else []
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+def contains(posting: List[int], sid: int) -> bool:
+    i = bisect_left(posting, sid)
+    return i < len(posting) and posting[i] == sid
+
+
+class SentenceCorpus:
+    """ Local example sentences indexed by character uni- and bigrams """
+    furigana: List[str]
+    plain: List[str]
+    translations: List[str]
+    index: Dict[str, List[int]]
+
+    def __init__(self, furigana: List[str], translations: List[str]):
+        plain = [strip_furigana(f) for f in furigana]
+
+        # Sentence ids are assigned in rank order (short and common first), so every posting list
+        # is sorted by rank and a lookup can stop as soon as it has collected enough hits.
+        doc_freq: Dict[str, int] = {}
+        for text in plain:
+            for gram in set(ngrams(text)):
+                doc_freq[gram] = doc_freq.get(gram, 0) + 1
+
+        def score(i: int) -> float:
+            grams = ngrams(plain[i])
+            if not grams:
+                return math.inf
+            commonness = sum(math.log(doc_freq[g]) for g in grams) / len(grams)
+            return len(plain[i]) - COMMONNESS_WEIGHT * commonness
+
+        order = sorted(range(len(plain)), key=score)
+        self.furigana = [furigana[i] for i in order]
+        self.plain = [plain[i] for i in order]
+        self.translations = [translations[i] for i in order]
+
+        self.index = {}
+        for sid, text in enumerate(self.plain):
+            for gram in dict.fromkeys(ngrams(text) + list(text)):  # unigrams are needed for one-character queries
+                self.index.setdefault(gram, []).append(sid)
+
+    # The index file holds plain lists and dicts only, so it does not depend on where this module is imported from
+    def to_data(self) -> dict:
+        return {"furigana": self.furigana, "plain": self.plain, "translations": self.translations, "index": self.index}
+
+    @classmethod
+    def from_data(cls, data: dict) -> "SentenceCorpus":
+        corpus = cls.__new__(cls)  # already ranked and indexed
+        corpus.furigana = data["furigana"]
+        corpus.plain = data["plain"]
+        corpus.translations = data["translations"]
+        corpus.index = data["index"]
+        return corpus
+
+    def __len__(self):
+        return len(self.plain)
+
+    def search(self, expr: str, limit: int = 3) -> List[dict]:
+        grams = ngrams(expr)
+        if not grams:
+            return []
+
+        postings = []
+        for gram in dict.fromkeys(grams):
+            if gram not in self.index:
+                return []
+            postings.append(self.index[gram])
+        postings.sort(key=len)
+
+        others = postings[1:]
+        hits = []
+        for sid in postings[0]:
+            if all(contains(o, sid) for o in others) and expr in self.plain[sid]:
+                hits.append({
+                    "content": self.plain[sid],
+                    "furigana": self.furigana[sid],
+                    "translation": self.translations[sid],
+                })
+                if len(hits) >= limit:
+                    break
+        return hits
+
+
+def read_dump(path: str) -> SentenceCorpus:
+    """ Reads a tab separated dump with one sentence per line: furigana text, optionally followed by a translation """
+    furigana = []
+    translations = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line == "" or line.startswith("#"):
+                continue
+            columns = line.split("\t")
+            furigana.append(columns[0])
+            translations.append(columns[1] if len(columns) > 1 else "")
+    return SentenceCorpus(furigana, translations)
+
+
+def load_corpus(path: str) -> Optional[SentenceCorpus]:
+    if not path:
+        return None
+    if not os.path.isfile(path):
+        log("Sentence corpus not found: " + path)
+        return None
+
+    stat = os.stat(path)
+    stamp = (INDEX_VERSION, stat.st_size, stat.st_mtime)
+    index_path = path + INDEX_SUFFIX
+
+    try:
+        with open(index_path, "rb") as f:
+            cached_stamp, data = marshal.load(f)
+        if tuple(cached_stamp) == stamp:
+            return SentenceCorpus.from_data(data)
+    except Exception:
+        pass  # no usable index yet
+
+    log("Building sentence index for " + path)
+    corpus = read_dump(path)
+    try:
+        with open(index_path + ".tmp", "wb") as f:
+            marshal.dump((stamp, corpus.to_data()), f)
+        os.replace(index_path + ".tmp", index_path)  # readers never see a half written index
+    except OSError as e:
+        log(e)
+    log(f"Indexed {len(corpus)} sentences")
+    return corpus
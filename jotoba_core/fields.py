@@ -0,0 +1,60 @@
+from typing import List
+
+from .utils import format_furigana
+from .words import Word
+
+# Field constants
+EXPRESSION_FIELD_NAME = "Expression"
+READING_FIELD_NAME = "Reading"
+PITCH_FIELD_NAME = "Pitch"
+MEANING_FIELD_NAME = "Meaning"
+POS_FIELD_NAME = "POS"
+IMAGE_FIELD_NAME = "Image"
+AUDIO_FIELD_NAME = "Audio"
+NOTES_FIELD_NAME = "Notes"
+EXAMPLE_FIELD_PREFIX = "Example "
+EXAMPLE_COUNT = 3
+KANJI_FIELD_NAME = "Kanji"  # optional, filled when the notetype has it
+
+ALL_FIELDS = [EXPRESSION_FIELD_NAME, READING_FIELD_NAME, PITCH_FIELD_NAME, MEANING_FIELD_NAME, POS_FIELD_NAME,
+             IMAGE_FIELD_NAME, AUDIO_FIELD_NAME, NOTES_FIELD_NAME, EXAMPLE_FIELD_PREFIX + "1",
+             EXAMPLE_FIELD_PREFIX + "1 Audio", EXAMPLE_FIELD_PREFIX + "2", EXAMPLE_FIELD_PREFIX + "2 Audio",
+             EXAMPLE_FIELD_PREFIX + "3", EXAMPLE_FIELD_PREFIX + "3 Audio"]
+
+# The functions below work on anything indexable by field name, i.e. anki Notes as well as plain dicts
+
+
+def meaning_text(word: Word) -> str:
+    return "; ".join(word.glosses[:3])
+
+
+def pos_text(word: Word) -> str:
+    return "; ".join(word.part_of_speech)
+
+
+def fill_word(note, word: Word, overwrite: bool = True):
+    if overwrite or note[EXPRESSION_FIELD_NAME] == "":
+        note[EXPRESSION_FIELD_NAME] = word.expression
+
+    if overwrite or note[READING_FIELD_NAME] == "":
+        note[READING_FIELD_NAME] = word.reading
+
+    if overwrite or note[PITCH_FIELD_NAME] == "":
+        note[PITCH_FIELD_NAME] = word.pitch
+
+    if overwrite or note[MEANING_FIELD_NAME] == "":
+        note[MEANING_FIELD_NAME] = meaning_text(word)
+
+    if overwrite or note[POS_FIELD_NAME] == "":
+        note[POS_FIELD_NAME] = pos_text(word)
+
+
+# Put sentences into the example fields; without overwrite they go into the empty fields in order
+def fill_sentences(note, sentences: List[dict], overwrite: bool = True):
+    targets = []
+    for i in range(EXAMPLE_COUNT):
+        if overwrite or note[EXAMPLE_FIELD_PREFIX + str(i + 1)] == "":
+            targets.append(i)
+
+    for i, sentence in zip(targets, sentences):
+        note[EXAMPLE_FIELD_PREFIX + str(i + 1)] = format_furigana(sentence["furigana"])
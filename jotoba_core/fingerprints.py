@@ -0,0 +1,31 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class FingerprintStore:
+    """ Fingerprint of the Jotoba data each note was last filled from, by note id """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("""
+            create table if not exists fingerprints (
+                nid integer primary key,
+                fingerprint text not null,
+                updated real not null
+            )""")
+        self._db.commit()
+
+    def get(self, nid: int) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("select fingerprint from fingerprints where nid = ?", (nid,)).fetchone()
+        return row[0] if row else None
+
+    def put_many(self, fingerprints: Dict[int, str]):
+        now = time.time()
+        with self._lock:
+            self._db.executemany("insert or replace into fingerprints values (?, ?, ?)",
+                                 [(nid, fp, now) for nid, fp in fingerprints.items()])
+            self._db.commit()
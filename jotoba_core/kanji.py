@@ -0,0 +1,125 @@
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def is_kanji(c: str) -> bool:
+    return "一" <= c <= "鿿" or "㐀" <= c <= "䶿" or "豈" <= c <= "﫿"
+
+
+def kanji_in(text: str) -> List[str]:
+    return list(dict.fromkeys(c for c in text if is_kanji(c)))
+
+
+class Kanji:
+    literal: str
+    meanings: List[str]
+    onyomi: List[str]
+    kunyomi: List[str]
+    stroke_count: int
+    record: dict  # as returned by Jotoba
+
+    def __init__(self, kanji: dict):
+        self.record = kanji
+        self.literal = kanji["literal"]
+        self.meanings = kanji.get("meanings", [])
+        self.onyomi = kanji.get("onyomi", [])
+        self.kunyomi = kanji.get("kunyomi", [])
+        self.stroke_count = kanji.get("stroke_count", 0)
+
+    def __repr__(self):
+        return f"{self.literal} ({', '.join(self.meanings[:2])})"
+
+
+class KanjiStore:
+    """ Kanji records by character; kept in memory and, given a path, in a sqlite file across sessions """
+
+    def __init__(self, path: str = ""):
+        self._lock = threading.Lock()
+        self._kanji: Dict[tuple, Kanji] = {}
+        self._in_flight: Dict[tuple, threading.Event] = {}  # kanji some thread is looking up right now
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("""
+                create table if not exists kanji (
+                    language text not null,
+                    literal text not null,
+                    body text not null,
+                    primary key (language, literal)
+                )""")
+            self._db.commit()
+
+    def get(self, language: str, literal: str) -> Optional[Kanji]:
+        with self._lock:
+            if (language, literal) in self._kanji:
+                return self._kanji[(language, literal)]
+            if self._db is None:
+                return None
+            row = self._db.execute("select body from kanji where language = ? and literal = ?", (language, literal)).fetchone()
+            if row is None:
+                return None
+            kanji = Kanji(json.loads(row[0]))
+            self._kanji[(language, literal)] = kanji
+            return kanji
+
+    def put(self, language: str, record: dict):
+        with self._lock:
+            self._kanji[(language, record["literal"])] = Kanji(record)
+            if self._db is not None:
+                self._db.execute("insert or replace into kanji values (?, ?, ?)",
+                                 (language, record["literal"], json.dumps(record, ensure_ascii=False)))
+                self._db.commit()
+
+    def record(self, language: str, literal: str) -> Optional[dict]:
+        kanji = self.get(language, literal)
+        return kanji.record if kanji is not None else None
+
+    def missing(self, language: str, literals: Iterable[str]) -> List[str]:
+        return [c for c in dict.fromkeys(literals) if self.get(language, c) is None]
+
+    def claim(self, language: str, literals: Iterable[str]) -> Tuple[List[str], List[threading.Event]]:
+        """ Splits the unknown literals into those the caller has to look up (and release afterwards)
+            and events for those another thread is looking up already """
+        missing = self.missing(language, literals)
+        mine = []
+        others = []
+        with self._lock:
+            for c in missing:
+                if (language, c) in self._in_flight:
+                    others.append(self._in_flight[(language, c)])
+                elif (language, c) not in self._kanji:  # not put in the meantime
+                    self._in_flight[(language, c)] = threading.Event()
+                    mine.append(c)
+        return mine, others
+
+    def release(self, language: str, literal: str):
+        with self._lock:
+            event = self._in_flight.pop((language, literal), None)
+        if event is not None:
+            event.set()
+
+
+# Kanji of an expression in order, as far as they are known to the store
+def get_kanji(store: KanjiStore, language: str, text: str) -> List[Kanji]:
+    found = []
+    for c in kanji_in(text):
+        kanji = store.get(language, c)
+        if kanji is not None:
+            found.append(kanji)
+    return found
+
+
+def kanji_html(kanji: List[Kanji]) -> str:
+    lines = []
+    for k in kanji:
+        line = f'<span class="kanji">{k.literal}</span> {", ".join(k.meanings[:3])}'
+        if k.onyomi:
+            line += f' <span class="on">{"、".join(k.onyomi)}</span>'
+        if k.kunyomi:
+            line += f' <span class="kun">{"、".join(k.kunyomi)}</span>'
+        if k.stroke_count:
+            line += f' <span class="strokes">{k.stroke_count}画</span>'
+        lines.append(line)
+    return "<br>".join(lines)
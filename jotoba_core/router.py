@@ -0,0 +1,96 @@
+import random
+import threading
+import time
+from typing import Callable, List, Optional
+
+import requests
+
+from .utils import log
+
+LATENCY_ALPHA = 0.3  # weight of the newest sample in the moving average
+FAILURE_THRESHOLD = 3  # consecutive failures until an instance is taken out of rotation
+COOLDOWN = 60  # seconds until an unhealthy instance gets another try
+
+
+class Instance:
+    url: str
+    latency: Optional[float]  # moving average in seconds, None until the first answer
+    failures: int
+    open_until: float  # circuit breaker: not used before this time
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency = None
+        self.failures = 0
+        self.open_until = 0
+
+    def __repr__(self):
+        return f"{self.url} ({self.latency}s, {self.failures} failures)"
+
+
+class Router:
+    """ Spreads requests across Jotoba instances, preferring fast ones and skipping unhealthy ones """
+    instances: List[Instance]
+
+    def __init__(self, urls: List[str]):
+        self.instances = [Instance(url) for url in urls]
+        self._lock = threading.Lock()
+
+    def healthy(self) -> List[Instance]:
+        now = time.time()
+        return [i for i in self.instances if i.open_until <= now]
+
+    # Random choice weighted by inverse latency, so bulk runs use every healthy instance but fast ones the most
+    def pick(self, exclude: List[Instance]) -> Optional[Instance]:
+        with self._lock:
+            candidates = [i for i in self.healthy() if i not in exclude]
+            if not candidates:
+                # everything is down: try the instance that comes back soonest rather than failing outright
+                candidates = sorted([i for i in self.instances if i not in exclude], key=lambda i: i.open_until)[:1]
+            if not candidates:
+                return None
+
+            known = [i.latency for i in candidates if i.latency is not None]
+            default = min(known) if known else 1.0  # unmeasured instances are tried as if they were the fastest
+            weights = [1 / max(i.latency if i.latency is not None else default, 0.001) for i in candidates]
+            return random.choices(candidates, weights)[0]
+
+    def record_success(self, instance: Instance, elapsed: float):
+        with self._lock:
+            if instance.latency is None:
+                instance.latency = elapsed
+            else:
+                instance.latency = LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * instance.latency
+            instance.failures = 0
+            instance.open_until = 0
+
+    def record_failure(self, instance: Instance):
+        with self._lock:
+            instance.failures += 1
+            if instance.failures >= FAILURE_THRESHOLD:
+                log(f"Taking {instance.url} out of rotation for {COOLDOWN}s")
+                instance.open_until = time.time() + COOLDOWN
+
+    def send(self, send: Callable[[str], requests.Response]) -> tuple[str, requests.Response]:
+        """ Calls send with an instance's base url until one answers; returns that url and its response """
+        tried = []
+        error: Optional[Exception] = None
+        while True:
+            instance = self.pick(tried)
+            if instance is None:
+                raise error or RuntimeError("No Jotoba instance configured")
+            tried.append(instance)
+
+            start = time.time()
+            try:
+                res = send(instance.url)
+                if res.status_code >= 500:
+                    res.raise_for_status()
+            except requests.RequestException as e:
+                log(f"{instance.url} failed: {e}")
+                self.record_failure(instance)
+                error = e
+                continue
+
+            self.record_success(instance, time.time() - start)
+            return instance.url, res
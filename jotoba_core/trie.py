@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from .cache import normalize_query
+from .utils import log
+from .words import Word
+
+ENTRIES = ""  # key of a node's entries; never a child as children are keyed by single characters
+
+
+class PrefixIndex:
+    """ Jotoba word records by every prefix of their expression and reading, for suggestions while typing """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root: Dict[str, dict] = {}
+        self._seen = set()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _insert(self, key: str, entry: Tuple[dict, str]):
+        node = self._root
+        for c in key:
+            node = node.setdefault(c, {})
+        node.setdefault(ENTRIES, []).append(entry)
+
+    # base_url is what the record's audio path is relative to
+    def add(self, record: dict, base_url: str = ""):
+        reading = record.get("reading", {})
+        expression = reading.get("kanji", reading.get("kana", ""))
+        kana = reading.get("kana", "")
+        if expression == "":
+            return
+        with self._lock:
+            if (expression, kana) in self._seen:
+                return
+            self._seen.add((expression, kana))
+            for key in dict.fromkeys([normalize_query(expression), normalize_query(kana)]):
+                if key:
+                    self._insert(key, (record, base_url))
+
+    def add_response(self, body: str, base_url: str = ""):
+        for record in json.loads(body).get("words", []):
+            self.add(record, base_url)
+
+    # Words starting with text, shortest first, so exact matches come before longer compounds
+    def search(self, text: str, limit: int = 8) -> List[Word]:
+        text = normalize_query(text)
+        if text == "":
+            return []
+        with self._lock:
+            node = self._root
+            for c in text:
+                if c not in node:
+                    return []
+                node = node[c]
+
+            found = {}  # a record is entered under its expression and its reading
+            level = [node]
+            while level and len(found) < limit:
+                for n in level:
+                    for entry in n.get(ENTRIES, []):
+                        if len(found) < limit:
+                            found.setdefault(id(entry[0]), entry)
+                level = [child for n in level for c, child in n.items() if c != ENTRIES]
+
+        return [Word(record, base_url) for record, base_url in found.values()]
+
+
+# Reads a dictionary dump with one Jotoba word record (as in the words API's answer) per line
+def read_dictionary(path: str) -> Iterable[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_dictionary(index: PrefixIndex, path: str, base_url: str = ""):
+    if not path or not os.path.isfile(path):
+        return
+    try:
+        for record in read_dictionary(path):
+            index.add(record, base_url)
+    except (OSError, ValueError, KeyError) as e:
+        log(f"Could not read dictionary {path}: {e}")
@@ -0,0 +1,60 @@
+import hashlib
+import json
+
+
+# Format furigana to anki's furigana style
+def format_furigana(furi: str) -> str:
+    out = ""
+
+    in_kanji = False
+
+    for c in furi:
+        if c == '[':
+            in_kanji = True
+            out +="<ruby>"
+            continue
+
+        if c == '|':
+            if in_kanji:
+                out += '<rp>(</rp><rt>'
+                in_kanji = False
+            continue
+
+        if c == ']':
+            out += "</rt><rp>)</rp></ruby>"
+            continue
+
+        out += c
+            
+    return out
+
+def log(msg: str):
+    print("[Jotoba Addon]", msg)
+
+# Remove furigana markup, leaving only the sentence text
+def strip_furigana(furi: str) -> str:
+    out = ""
+
+    in_reading = False
+
+    for c in furi:
+        if c == '[':
+            continue
+
+        if c == '|':
+            in_reading = True
+            continue
+
+        if c == ']':
+            in_reading = False
+            continue
+
+        if not in_reading:
+            out += c
+
+    return out
+
+
+# Stable hash of a JSON-like record, used to notice when Jotoba's data for a note changed
+def fingerprint(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
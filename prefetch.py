@@ -0,0 +1,215 @@
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from anki.collection import Collection, SearchNode
+from anki.notes import NoteId
+from aqt import mw, gui_hooks
+from aqt.browser.sidebar import SidebarItem, SidebarItemType
+from aqt.operations import QueryOp
+from aqt.qt import *
+from aqt.utils import showInfo, tooltip
+
+from .editor import EXPRESSION_FIELD_NAME, READING_FIELD_NAME, KANJI_FIELD_NAME, get_joto_fields
+from .jotoba import *
+from .progress import ThrottledProgress, TooltipProgress
+from .utils import log
+
+PREFETCH_DELAY = 0.2  # seconds to wait after a note that needed requests to Jotoba
+
+_progress: Optional[TooltipProgress] = None  # of the running prefetch
+
+
+class PrefetchStats:
+    notes: int
+    lookups: int
+    hits: int
+    errors: int
+    # what was looked up, for exporting it as a bundle
+    words: List[str]
+    sentences: List[str]
+    kanji_texts: List[str]
+    audio_urls: List[str]
+
+    def __init__(self):
+        self.notes = 0
+        self.lookups = 0
+        self.hits = 0
+        self.errors = 0
+        self.words = []
+        self.sentences = []
+        self.kanji_texts = []
+        self.audio_urls = []
+
+    def count(self, hit: bool):
+        self.lookups += 1
+        if hit:
+            self.hits += 1
+
+    def summary(self) -> str:
+        rate = self.hits / self.lookups if self.lookups else 0
+        return (f"Prefetched Jotoba data for {self.notes} notes.\n"
+                f"{self.lookups} lookups, {self.hits} already cached ({rate:.0%} hit rate), {self.errors} errors.")
+
+
+def prefetch_word(expr: str, kana: str, stats: PrefetchStats) -> Optional[Word]:
+    stats.count(is_cached("words", expr))
+    stats.words.append(expr)
+    word, top_hits = request_word(expr, kana)
+    if not word and top_hits:
+        word = top_hits[0]
+    return word
+
+
+def prefetch_sentences(expr: str, stats: PrefetchStats):
+    stats.count(is_cached("sentences", expr))
+    stats.sentences.append(expr)
+    request_sentence(expr)
+
+
+def prefetch_audio(url: str, stats: PrefetchStats):
+    stats.count(is_audio_cached(url))
+    stats.audio_urls.append(url)
+    request_audio(url)
+
+
+def prefetch_kanji(texts: List[str], stats: PrefetchStats):
+    stats.kanji_texts += texts
+    stats.lookups += resolve_kanji(texts)
+
+
+# (expression, reading, has a kanji field) of the deck's notes that have the Jotoba fields
+def read_notes(col: Collection, nids: Sequence[NoteId]) -> List[Tuple[str, str, bool]]:
+    notes = []
+    for nid in nids:
+        note = col.get_note(nid)
+        if get_joto_fields(note.note_type()):
+            notes.append((note[EXPRESSION_FIELD_NAME], note[READING_FIELD_NAME], KANJI_FIELD_NAME in note))
+    return notes
+
+
+# Performs the same lookups as the bulk update and the editor, without touching the notes
+def prefetch_notes(notes: Sequence[Tuple[str, str, bool]], progress: ThrottledProgress) -> PrefetchStats:
+    stats = PrefetchStats()
+
+    for i, (expression, reading, has_kanji_field) in enumerate(notes):
+        progress.update(i)
+        if progress.want_cancel():
+            break
+        stats.notes += 1
+
+        expr = sanitize(expression)
+        if expr == "":
+            continue
+
+        hits = stats.hits
+        lookups = stats.lookups
+        try:
+            word = prefetch_word(expr, reading, stats)
+            prefetch_sentences(expression, stats)  # what the bulk update looks up
+            if word is None:
+                continue
+            if word.expression != expression:
+                prefetch_sentences(word.expression, stats)  # what the editor looks up
+            if hasattr(word, "audio_url"):
+                prefetch_audio(word.audio_url, stats)
+            if has_kanji_field:
+                prefetch_kanji([word.expression], stats)
+        except Exception as e:
+            log("Error: Could not prefetch '" + expr + "'")
+            log(e)
+            stats.errors += 1
+        finally:
+            if stats.lookups - lookups > stats.hits - hits:  # asked Jotoba; leave room for the user's own lookups
+                time.sleep(PREFETCH_DELAY)
+
+    return stats
+
+
+def deck_note_ids(deck_name: str) -> Sequence[NoteId]:
+    return mw.col.find_notes(mw.col.build_search_string(SearchNode(deck=deck_name)))
+
+
+# Runs op(notes, progress) in the background without a progress dialog, so Anki stays usable meanwhile;
+# the deck's context menu offers to stop it. Operations on the collection run one after another, so only reading the
+# notes uses it; op runs beside them and must not touch the collection.
+def run_in_background(parent: QWidget, label: str, nids: Sequence[NoteId], op, success):
+    global _progress
+    if _progress is not None:
+        showInfo("Jotoba data is already being prefetched. Right-click a deck in the browser to stop it.")
+        return
+
+    progress = TooltipProgress(label, len(nids), cancel_hint="Right-click a deck in the browser to stop")
+    _progress = progress
+
+    def done(result):
+        global _progress
+        _progress = None
+        success(result)
+
+    def failed(e: Exception):
+        global _progress
+        _progress = None
+        showInfo(f"Prefetching Jotoba data failed: {e}")
+
+    def run(notes: List[Tuple[str, str, bool]]):
+        progress.total = len(notes)
+        query = QueryOp(parent=parent, op=lambda col: op(notes, progress), success=done).without_collection()
+        query.failure(failed).run_in_background()
+
+    QueryOp(parent=parent, op=lambda col: read_notes(col, nids), success=run).failure(failed).run_in_background()
+    tooltip(label)
+
+
+def stop_prefetch():
+    if _progress is not None:
+        _progress.cancel()
+        tooltip("Stopping...")
+
+
+def prefetch_deck(parent: QWidget, deck_name: str):
+    if CONFIG.cache_dir == "":
+        showInfo("Enable Cache_Lookups in the add-on config to prefetch data")
+        return
+
+    nids = deck_note_ids(deck_name)
+    run_in_background(parent, "Prefetching Jotoba data...", nids,
+                      prefetch_notes,
+                      lambda stats: showInfo(stats.summary()))
+
+
+# Prefetches a deck and writes everything it needs into a bundle other users can import
+def export_deck_bundle(parent: QWidget, deck_name: str):
+    if CONFIG.cache_dir == "":
+        showInfo("Enable Cache_Lookups in the add-on config to export data")
+        return
+
+    path, _ = QFileDialog.getSaveFileName(parent, "Export Jotoba bundle", deck_name.replace("::", "_") + BUNDLE_SUFFIX,
+                                          f"Jotoba bundle (*{BUNDLE_SUFFIX})")
+    if not path:
+        return
+
+    nids = deck_note_ids(deck_name)
+
+    def op(notes: Sequence[Tuple[str, str, bool]], progress: ThrottledProgress) -> Tuple[PrefetchStats, int]:
+        stats = prefetch_notes(notes, progress)
+        return stats, export_bundle(path, stats.words, stats.sentences, stats.kanji_texts, stats.audio_urls)
+
+    run_in_background(parent, "Exporting Jotoba data...", nids, op,
+                      lambda result: showInfo(f"{result[0].summary()}\nExported {result[1]} entries to {path}"))
+
+
+def add_deck_menu_entry(sidebar, menu: QMenu, item: SidebarItem, index):
+    if item.item_type != SidebarItemType.DECK:
+        return
+    menu.addSeparator()
+    if _progress is not None:
+        menu.addAction("Stop prefetching Jotoba data").triggered.connect(stop_prefetch)
+        return
+    a = menu.addAction("Prefetch Jotoba data")
+    a.triggered.connect(lambda: prefetch_deck(sidebar.browser.window(), item.full_name))
+    a = menu.addAction("Export Jotoba bundle...")
+    a.triggered.connect(lambda: export_deck_bundle(sidebar.browser.window(), item.full_name))
+
+
+def init():
+    gui_hooks.browser_sidebar_will_show_context_menu.append(add_deck_menu_entry)
@@ -0,0 +1,71 @@
+import time
+
+from aqt import mw
+from aqt.utils import tooltip
+
+PROGRESS_INTERVAL = 0.25  # seconds between two progress updates
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+
+class ThrottledProgress:
+    """ Reports the progress of a background operation at a fixed rate, with notes/sec and ETA """
+    label: str
+    total: int
+    unit: str
+    interval: float = PROGRESS_INTERVAL
+    cancel_hint: str = "Press Esc to cancel"
+
+    def __init__(self, label: str, total: int, unit: str = "notes"):
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.start = time.time()
+        self._last_update = 0.0
+
+    def update(self, done: int, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_update < self.interval:
+            return
+        self._last_update = now
+
+        label = f"{self.label} ({done}/{self.total})"
+        elapsed = now - self.start
+        if done > 0 and elapsed > 0:
+            rate = done / elapsed
+            label += f"\n{rate:.1f} {self.unit}/s, ETA {format_duration((self.total - done) / rate)}"
+        label += "\n" + self.cancel_hint
+
+        self.post(label, done, self.total)
+
+    # Runs on the operation's thread; values are bound now, the lambda runs later on the main thread
+    def post(self, label: str, done: int, total: int):
+        mw.taskman.run_on_main(lambda: mw.progress.update(label=label, value=done, max=total))
+
+    def want_cancel(self) -> bool:
+        return mw.progress.want_cancel()
+
+
+class TooltipProgress(ThrottledProgress):
+    """ Progress of an operation that runs without a progress dialog, shown as a tooltip every few seconds """
+    interval = 3
+    cancelled: bool
+
+    def __init__(self, label: str, total: int, unit: str = "notes", cancel_hint: str = ""):
+        super().__init__(label, total, unit)
+        self.cancel_hint = cancel_hint
+        self.cancelled = False
+
+    def post(self, label: str, done: int, total: int):
+        mw.taskman.run_on_main(lambda: tooltip(label.replace("\n", "<br>"), period=int(self.interval * 1000) + 500))
+
+    def cancel(self):
+        self.cancelled = True
+
+    def want_cancel(self) -> bool:
+        return self.cancelled
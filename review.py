@@ -0,0 +1,112 @@
+from typing import List, Optional
+
+from anki.notes import Note
+from aqt.qt import *
+
+from .editor import EXPRESSION_FIELD_NAME, READING_FIELD_NAME
+from .jotoba import Word
+
+
+class Ambiguous:
+    """ A note without an exact match, kept with everything already fetched for it """
+    note: Note
+    top_hits: List[Word]
+    sentences: Optional[List[dict]]
+    old_fingerprint: Optional[str]
+
+    def __init__(self, note: Note, top_hits: List[Word], sentences: Optional[List[dict]], old_fingerprint: Optional[str]):
+        self.note = note
+        self.top_hits = top_hits
+        self.sentences = sentences
+        self.old_fingerprint = old_fingerprint
+
+
+class ReviewDialog(QDialog):
+    """ Steps through ambiguous notes; Enter selects the highlighted word, Del skips the note, Esc skips the rest """
+    items: List[Ambiguous]
+    choices: List[Optional[Word]]
+
+    def __init__(self, parent: QWidget, items: List[Ambiguous]):
+        super().__init__(parent)
+        self.items = items
+        self.choices = [None] * len(items)
+        self.current = 0
+
+        self.setWindowTitle("Select words")
+        self.setWindowModality(Qt.WindowModality.WindowModal)
+        self.setMinimumWidth(400)
+        self.setMinimumHeight(300)
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        self.title = QLabel()
+        layout.addWidget(self.title)
+
+        self.list_widget = QListWidget()
+        self.list_widget.currentRowChanged.connect(self.show_word_info)
+        self.list_widget.itemDoubleClicked.connect(self.select_word)
+        layout.addWidget(self.list_widget)
+
+        self.expression = QLabel()
+        self.meaning = QLabel()
+        self.meaning.setWordWrap(True)
+        layout.addWidget(self.expression)
+        layout.addWidget(self.meaning)
+
+        select_btn = QPushButton("Select (Enter)")
+        select_btn.clicked.connect(self.select_word)
+        select_btn.setDefault(True)  # Enter
+        skip_btn = QPushButton("Skip (Del)")
+        skip_btn.clicked.connect(self.skip_note)
+        skip_btn.setShortcut(QKeySequence(Qt.Key.Key_Delete))
+        skip_btn.setAutoDefault(False)
+        finish_btn = QPushButton("Skip remaining (Esc)")
+        finish_btn.clicked.connect(self.reject)
+        finish_btn.setAutoDefault(False)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addWidget(select_btn)
+        btn_layout.addWidget(skip_btn)
+        btn_layout.addWidget(finish_btn)
+        layout.addLayout(btn_layout)
+
+        self.show_note()
+
+    def show_note(self):
+        item = self.items[self.current]
+        note = item.note
+        self.title.setText(f"{self.current + 1} of {len(self.items)}: No exact match for "
+                           f"{note[EXPRESSION_FIELD_NAME]} ({note[READING_FIELD_NAME]}). Please select a word from the list.")
+        self.list_widget.clear()
+        for hit in item.top_hits:
+            self.list_widget.addItem(f"{hit.expression} ({hit.reading})" if hit.reading else hit.expression)
+        self.list_widget.setCurrentRow(0)
+        self.list_widget.setFocus()
+
+    def show_word_info(self, row: int):
+        if row < 0:
+            return
+        selected_word = self.items[self.current].top_hits[row]
+        self.expression.setText(f"Expression: {selected_word.expression} ({selected_word.reading})")
+        self.meaning.setText(f"Meaning: {'; '.join(selected_word.glosses)}")
+
+    def select_word(self):
+        self.choices[self.current] = self.items[self.current].top_hits[self.list_widget.currentRow()]
+        self.next_note()
+
+    def skip_note(self):
+        self.next_note()
+
+    def next_note(self):
+        self.current += 1
+        if self.current < len(self.items):
+            self.show_note()
+        else:
+            self.accept()
+
+
+# Returns the chosen word for every item, None where the note was skipped
+def review_ambiguous(parent: QWidget, items: List[Ambiguous]) -> List[Optional[Word]]:
+    dialog = ReviewDialog(parent, items)
+    dialog.exec()
+    return dialog.choices
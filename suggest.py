@@ -0,0 +1,144 @@
+import json
+import weakref
+from typing import Any, List, Tuple
+
+from anki.utils import strip_html
+from aqt import mw, gui_hooks
+from aqt.editor import Editor
+from aqt.qt import *
+
+from .editor import EXPRESSION_FIELD_NAME, fields_empty, fill_data, get_joto_fields
+from .jotoba import Word, build_suggestions, suggest
+from .utils import log
+
+config = mw.addonManager.getConfig(__name__)
+
+ENABLED = config.get("Suggestions", True)
+SUGGESTION_COUNT = 8
+
+_popups: "weakref.WeakKeyDictionary[Editor, SuggestionPopup]" = weakref.WeakKeyDictionary()
+
+# Bounding box of the focused field in the editor (the field's shadow host is the document's active element)
+FIELD_RECT_JS = """(function() {
+    const el = document.activeElement;
+    if (!el) { return null; }
+    const r = el.getBoundingClientRect();
+    return JSON.stringify({left: r.left, bottom: r.bottom});
+})()"""
+
+
+class SuggestionPopup(QListWidget):
+    """ Words matching the expression being typed; shown without taking the focus from the editor """
+    editor: Editor
+    words: List[Word]
+
+    def __init__(self, editor: Editor):
+        super().__init__(editor.widget)
+        self.editor = editor
+        self.words = []
+        self.setWindowFlags(Qt.WindowType.ToolTip | Qt.WindowType.FramelessWindowHint)
+        self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setMinimumWidth(300)
+        self.itemClicked.connect(self.pick)
+
+    def show_words(self, words: List[Word], pos: QPoint):
+        self.words = words
+        self.clear()
+        for word in words:
+            text = f"{word.expression} ({word.reading})" if word.reading else word.expression
+            if word.glosses:
+                text += f" - {word.glosses[0]}"
+            self.addItem(text)
+        self.setFixedHeight(self.sizeHintForRow(0) * len(words) + 2 * self.frameWidth())
+        self.move(pos)
+        self.show()
+
+    # The word is known already, so neither the focus-lost lookup nor the selection dialog is needed
+    def pick(self, item: QListWidgetItem):
+        word = self.words[self.row(item)]
+        self.hide()
+        note = self.editor.note
+        if note is None:
+            return
+        fill_data(note, word, False)
+        self.editor.loadNote()
+
+
+def get_popup(editor: Editor) -> SuggestionPopup:
+    if editor not in _popups:
+        _popups[editor] = SuggestionPopup(editor)
+    return _popups[editor]
+
+
+def hide_popup(editor: Editor):
+    if editor in _popups:
+        _popups[editor].hide()
+
+
+def show_suggestions(editor: Editor, words: List[Word]):
+    def show(rect):
+        web = editor.web
+        pos = QPoint(0, 0)
+        if rect:
+            rect = json.loads(rect)
+            zoom = web.zoomFactor()
+            pos = QPoint(int(rect["left"] * zoom), int(rect["bottom"] * zoom))
+        get_popup(editor).show_words(words, web.mapToGlobal(pos))
+
+    editor.web.evalWithCallback(FIELD_RECT_JS, show)
+
+
+def on_field_changed(editor: Editor, fidx: int, text: str):
+    note = editor.note
+    if note is None:
+        return
+    joto_fields = get_joto_fields(note.note_type())
+    if joto_fields is None or fidx != joto_fields[EXPRESSION_FIELD_NAME] or not fields_empty(note):
+        hide_popup(editor)
+        return
+
+    words = suggest(strip_html(text), SUGGESTION_COUNT)
+    if words:
+        show_suggestions(editor, words)
+    else:
+        hide_popup(editor)
+
+
+# The editor reports every edit as "key:ord:nid:text" and leaving a field as "blur:ord:nid:text"
+def on_js_message(handled: Tuple[bool, Any], message: str, context: Any) -> Tuple[bool, Any]:
+    if not isinstance(context, Editor):
+        return handled
+    if message.startswith("key:"):
+        _, ord_str, _, text = message.split(":", 3)
+        try:
+            on_field_changed(context, int(ord_str), text)
+        except Exception as e:
+            log(e)
+    elif message.startswith("blur:"):
+        hide_popup(context)
+    return handled
+
+
+def on_note_loaded(editor: Editor):
+    hide_popup(editor)
+
+
+# Nothing is suggested until the index is built. It only reads the add-on's own files, so it does not hold up the
+# collection's operations meanwhile.
+def on_profile_open():
+    def done(future):
+        try:
+            future.result()
+        except Exception as e:
+            log(e)
+
+    mw.taskman.run_in_background(build_suggestions, done, uses_collection=False)
+
+
+def init():
+    if not ENABLED:
+        return
+    gui_hooks.profile_did_open.append(on_profile_open)
+    gui_hooks.webview_did_receive_js_message.append(on_js_message)
+    gui_hooks.editor_did_load_note.append(on_note_loaded)